@@ -1,9 +1,20 @@
 import pandas as pd
-import yfinance as yf
 import numpy as np
 import time
-import requests
 import os
+import itertools
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+from indicators import (SymbolIndicators, load_indicator_states, panel_rolling_mean, panel_rsi_sma,
+                        panel_vwap, save_indicator_states, stack_frames)
+from notifier import TelegramDispatcher, ToggleFile
+from cycle_metrics import CycleMetrics, CycleRecord
+from market_calendar import SESSION_CLOSE, BarCloseScheduler, MarketCalendar
+from portfolio_sim import (fill_journal_results, portfolio_summary, positions_to_frame, simulate_portfolio,
+                           symbol_candidates)
+from trade_journal import TRADE_LOG_COLUMNS, TradeJournal
+from market_data import (BAR_STORE_DIR, INTERVAL_MINUTES, BarStore, CachedProvider, ResamplingProvider,
+                         YFinanceProvider, fetch_concurrent)
 
 # ================= Configuration =================
 TICKERS_FILE = "your_file.csv"
@@ -13,114 +24,248 @@ RISK_REWARD = 2
 STOP_BUFFER = 0.005
 RSI_PERIOD = 14
 VOLUME_MULTIPLIER = 1
-INTERVAL_SECONDS = 900  # 15 min
+SIGNAL_INTERVAL = "15m" # Live aur backtest signals is timeframe ke bars par ("30m", "1h" bhi chalega)
+INTERVAL_SECONDS = INTERVAL_MINUTES[SIGNAL_INTERVAL] * 60  # 15 min bars; har bar close ke baad ek cycle
+BAR_CLOSE_OFFSET_SECONDS = 20 # Bar close ke itne seconds baad fetch, taaki band bar data source par aa jaye
+MARKET_HOLIDAYS_FILE = "nse_holidays.txt" # In dino (aur weekends par) koi fetch nahi hota
+SCHEDULER_STATE_FILE = "last_bar_close.txt" # Aakhri process hua bar close; restart par yahin se catch-up
 STATUS_INTERVAL_SECONDS = 3600 # 1 hour for status update
 TELEGRAM_TOGGLE_FILE = "telegram_toggle.txt"
+TELEGRAM_COALESCE_SIGNALS = False # True = ek cycle ke saare signals ek hi message mein
+
+# Bars local store se aate hain; network se sirf naye bars fetch hote hain. Har symbol ka sirf base
+# interval download hota hai, bade timeframes (1h, 1d) usi se locally bante hain.
+BASE_INTERVAL = "15m"
+SYMBOL_BASE_INTERVALS = {} # Kisi symbol ka alag base interval, jaise {"XYZ.NS": "5m"}
+DATA_PROVIDER = ResamplingProvider(CachedProvider(YFinanceProvider(auto_adjust=False), BarStore(BAR_STORE_DIR)),
+                                   BASE_INTERVAL, SYMBOL_BASE_INTERVALS)
+FETCH_CONCURRENCY = 16 # Ek saath kitne symbols fetch hon
+FETCH_RATE_PER_SEC = 10 # Har second zyada se zyada itne naye requests (None = koi limit nahi)
+FETCH_TIMEOUT_SECONDS = 30 # Ek symbol ke ek attempt ka max time
+FETCH_RETRIES = 2 # Fail/timeout par kitni baar dobara try karein
+INDICATOR_CHECKPOINT_FILE = "indicator_state.pkl" # Restart par indicator state yahan se wapas aati hai
+TRADE_JOURNAL_FILE = "trade_journal.db" # Live signals ka SQLite journal (CSV log iska mirror hai)
+CYCLE_OVERRUN_FRACTION = 0.5 # Cycle INTERVAL_SECONDS ke itne hisse se lamba chale to overrun flag hota hai
+CYCLE_METRICS_FILE = "cycle_metrics.jsonl" # Har cycle ki timings (rotating JSONL)
+METRICS_PORT = 9108 # Local Prometheus endpoint http://127.0.0.1:9108/metrics (None = band)
 
 # Backtesting Configuration (Naya)
 RUN_BACKTEST = False # True karein backtest chalane ke liye, False karein live trading ke liye
 BACKTEST_PERIOD = "1y" # Jaise ki "1mo", "6mo", "1y", "5y"
+BACKTEST_WORKERS = os.cpu_count() or 1 # 1 = serial run, zyada = utne processes mein parallel backtest
+RUN_SWEEP = False # True karein parameter sweep ke liye (RUN_BACKTEST se pehle check hota hai)
+# Sweep grid: har combination ka VWAP-cross backtest; results backtest_sweep.csv mein PnL ke order mein
+SWEEP_GRID = {
+    "RSI_PERIOD": [7, 14, 21],
+    "RSI_LOW": [20, 25, 30, 35],
+    "RSI_HIGH": [65, 70, 75, 80],
+    "VOLUME_MULTIPLIER": [0.8, 1, 1.2, 1.5, 2],
+}
+RUN_PORTFOLIO_SIM = False # True karein live strategy (SL/target exits) ka portfolio simulation chalane ke liye
+RUN_SCREEN = False # True karein poore universe ke aakhri band bar ka ek baar screen (screen_results.csv) ke liye
+MAX_OPEN_POSITIONS = 10 # Ek saath zyada se zyada itni positions
+CAPITAL_PER_TRADE = 100000 # Har trade mein itne rupaye (ya bacha cash, jo kam ho)
+PORTFOLIO_CAPITAL = 1000000 # Simulation ka shuruaati capital
 
 # ================= Helper Functions =================
+TELEGRAM_TOGGLE = ToggleFile(TELEGRAM_TOGGLE_FILE) # File sirf mtime badalne par dobara padhi jaati hai
+_telegram_dispatcher = None
+
 def is_telegram_enabled():
     """Check karein ki telegram messages on hain ya off."""
-    try:
-        if os.path.exists(TELEGRAM_TOGGLE_FILE):
-            with open(TELEGRAM_TOGGLE_FILE, 'r') as f:
-                setting = f.read().strip().lower()
-                return setting == 'on'
-        return True # Default roop se messages on rakhein
-    except Exception as e:
-        print(f"File reading error: {e}")
-        return True # Error aane par bhi messages on rakhein
+    return TELEGRAM_TOGGLE.enabled()
 
-def send_telegram(message):
-    if not is_telegram_enabled():
-        print("Telegram messages off hain, message nahi bheja gaya.")
-        return
+def get_telegram_dispatcher():
+    """Background dispatcher pehli zaroorat par banta hai (backtest workers mein thread nahi chahiye)."""
+    global _telegram_dispatcher
+    if _telegram_dispatcher is None:
+        _telegram_dispatcher = TelegramDispatcher(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, toggle=TELEGRAM_TOGGLE)
+    return _telegram_dispatcher
 
-    # Telegram API ko sahi tarike se call karein
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    # Sahi key 'text' ka upyog karein
-    payload = {"chat_id": TELEGRAM_CHAT_ID, "text": message}
-    try:
-        requests.post(url, data=payload)
-    except Exception as e:
-        print(f"Telegram Error: {e}")
+def send_telegram(message):
+    # Message queue mein jaata hai; bhejna, retry aur rate limit background thread karta hai
+    get_telegram_dispatcher().send(message)
 
 def vwap(df):
-    p = (df['High'] + df['Low'] + df['Close']) / 3
-    q = df['Volume']
-    return (p * q).cumsum() / q.cumsum()
+    # indicators module ka vectorized kernel (poore panel ke liye bhi wahi code chalta hai)
+    values = panel_vwap(df['High'].to_numpy(dtype=float), df['Low'].to_numpy(dtype=float),
+                        df['Close'].to_numpy(dtype=float), df['Volume'].to_numpy(dtype=float))
+    return pd.Series(values, index=df.index)
 
 def rsi(series, period=RSI_PERIOD):
-    delta = series.diff()
-    up = delta.clip(lower=0)
-    down = -1 * delta.clip(upper=0)
-    ma_up = up.rolling(period, min_periods=1).mean()
-    ma_down = down.rolling(period, min_periods=1).mean()
-    rs = ma_up / ma_down
-    return 100 - (100 / (1 + rs))
+    return pd.Series(panel_rsi_sma(series.to_numpy(dtype=float), period), index=series.index)
+
+def volume_average(df, window=20):
+    return pd.Series(panel_rolling_mean(df['Volume'].to_numpy(dtype=float), window, 1), index=df.index)
 
 # ================= Backtesting Function (Naya) =================
-def run_backtest(tickers, period):
-    print(f"Backtesting shuru ho raha hai, period: {period}")
-    send_telegram(f"Backtesting shuru ho raha hai, period: {period}")
-    all_trades = pd.DataFrame(columns=["Stock","Direction","Entry","Exit","PnL","Duration"])
+def _next_true_index(mask):
+    """Har position i ke liye pehla index j >= i jahan mask True hai (na mile to len(mask)).
+
+    Aakhri axis par kaam karta hai, isliye (combinations, bars) wale 2-D mask par bhi chalta hai.
+    Result mein ek extra sentinel element hota hai, taaki `result[i + 1]` hamesha valid rahe.
+    """
+    n = mask.shape[-1]
+    idx = np.where(mask, np.arange(n), n)
+    idx = np.concatenate([idx, np.full(mask.shape[:-1] + (1,), n)], axis=-1)
+    return np.minimum.accumulate(idx[..., ::-1], axis=-1)[..., ::-1]
+
+def _walk_trades(next_entry, long_mask, next_below, next_above):
+    """Entry/exit lookups par trade-by-trade chalta hai; Python loop sirf trades par hai, bars par nahi."""
+    n = len(long_mask)
+    # Har trade kam se kam do bars leta hai, isliye n // 2 + 1 kaafi hai
+    max_trades = n // 2 + 1
+    entry_idx = np.empty(max_trades, dtype=np.int64)
+    exit_idx = np.empty(max_trades, dtype=np.int64)
+    direction = np.empty(max_trades, dtype=np.int8)
+
+    count = 0
+    pos = 0
+    while pos < n:
+        i = next_entry[pos]
+        if i >= n:
+            break
+        if long_mask[i]:
+            j = next_below[i + 1]
+            d = 1
+        else:
+            j = next_above[i + 1]
+            d = -1
+        if j >= n:
+            break  # Aakhri trade abhi bhi open hai, original loop ki tarah record nahi hota
+        entry_idx[count] = i
+        exit_idx[count] = j
+        direction[count] = d
+        count += 1
+        pos = j + 1
+
+    return entry_idx[:count], exit_idx[:count], direction[:count]
+
+def simulate_vwap_cross_batch(close, vwap_values, rsi_values, volume, volume_avg,
+                              rsi_low, rsi_high, volume_multiplier):
+    """Kai parameter combinations ke liye VWAP-cross strategy ek saath chalata hai.
+
+    rsi_low, rsi_high aur volume_multiplier same length ke arrays (ya scalars) hain; entry masks
+    (combinations, bars) shape mein broadcast hote hain, exit lookups sab combinations mein share
+    hote hain. Har combination ke liye (entry_idx, exit_idx, direction) ki list return karta hai.
+    """
+    close = np.asarray(close, dtype=float)
+    vwap_values = np.asarray(vwap_values, dtype=float)
+    rsi_values = np.asarray(rsi_values, dtype=float)
+    volume = np.asarray(volume, dtype=float)
+    volume_avg = np.asarray(volume_avg, dtype=float)
+    rsi_low, rsi_high, volume_multiplier = (
+        np.asarray(p)[:, None] for p in np.broadcast_arrays(
+            np.atleast_1d(rsi_low), np.atleast_1d(rsi_high), np.atleast_1d(volume_multiplier)))
+
+    above = close > vwap_values
+    below = close < vwap_values
+    volume_ok = volume > volume_multiplier * volume_avg
+    long_mask = above & (rsi_values < rsi_low) & volume_ok
+    short_mask = below & (rsi_values > rsi_high) & volume_ok
+
+    next_entry = _next_true_index(long_mask | short_mask)
+    next_below = _next_true_index(below)
+    next_above = _next_true_index(above)
+    return [_walk_trades(next_entry[c], long_mask[c], next_below, next_above) for c in range(len(long_mask))]
+
+def simulate_vwap_cross(close, vwap_values, rsi_values, volume, volume_avg):
+    """VWAP-cross strategy ko poore arrays par chalata hai (bar-by-bar loop ke bina).
+
+    Entry: Close/VWAP, RSI 30/70 aur Volume > VOLUME_MULTIPLIER * VolumeAvg wale masks.
+    Exit: entry ke baad pehla bar jahan Close VWAP ke doosri taraf chala jaye.
 
+    Returns (entry_idx, exit_idx, direction) numpy arrays; direction 1 = Long, -1 = Short.
+    """
+    return simulate_vwap_cross_batch(close, vwap_values, rsi_values, volume, volume_avg,
+                                     30, 70, VOLUME_MULTIPLIER)[0]
+
+def backtest_ticker(data):
+    """Ek ticker ke 15m data par backtest chala kar compact trade arrays ka dict return karta hai."""
+    close = data["Close"].to_numpy(dtype=float)
+    data_vwap = vwap(data).to_numpy(dtype=float)
+    data_rsi = rsi(data["Close"]).to_numpy(dtype=float)
+    volume_avg = volume_average(data).to_numpy(dtype=float)
+
+    entry_idx, exit_idx, direction = simulate_vwap_cross(
+        close, data_vwap, data_rsi, data["Volume"].to_numpy(dtype=float), volume_avg)
+
+    entry = close[entry_idx]
+    exit_price = close[exit_idx]
+    times = data.index
+    return {
+        "Direction": direction,
+        "Entry": entry,
+        "Exit": exit_price,
+        "PnL": np.where(direction == 1, exit_price - entry, entry - exit_price),
+        "Duration": np.asarray(times[exit_idx] - times[entry_idx]),
+    }
+
+TRADE_COLUMNS = ["Stock", "Direction", "Entry", "Exit", "PnL", "Duration"]
+
+def trades_to_frame(ticker_trades):
+    """(ticker, trade arrays) ki list ko ek hi baar mein DataFrame mein jodta hai, list ke order mein."""
+    ticker_trades = [(t, c) for t, c in ticker_trades if len(c["Entry"])]
+    if not ticker_trades:
+        return pd.DataFrame(columns=TRADE_COLUMNS)
+    direction = np.concatenate([c["Direction"] for _, c in ticker_trades])
+    return pd.DataFrame({
+        "Stock": np.concatenate([np.full(len(c["Entry"]), t, dtype=object) for t, c in ticker_trades]),
+        "Direction": np.where(direction == 1, "Long", "Short").astype(object),
+        "Entry": np.concatenate([c["Entry"] for _, c in ticker_trades]),
+        "Exit": np.concatenate([c["Exit"] for _, c in ticker_trades]),
+        "PnL": np.concatenate([c["PnL"] for _, c in ticker_trades]),
+        "Duration": np.concatenate([c["Duration"] for _, c in ticker_trades]),
+    })
+
+def backtest_shard(tickers, period, ticker_fn=backtest_ticker, fn_args=()):
+    """Tickers ke ek shard ka backtest; worker process mein bhi chal sakta hai.
+
+    Har ticker ke liye (ticker, ticker_fn(data, *fn_args), error message) return karta hai.
+    """
+    results = []
     for ticker in tickers:
         try:
-            data = yf.Ticker(ticker).history(period=period, interval="15m", auto_adjust=False)
+            data = DATA_PROVIDER.history(ticker, SIGNAL_INTERVAL, period)
             if data.empty:
+                results.append((ticker, None, None))
                 continue
-
-            data["VWAP"] = vwap(data)
-            data["RSI"] = rsi(data["Close"])
-            data["VolumeAvg"] = data["Volume"].rolling(20, min_periods=1).mean()
-
-            in_trade = False
-            entry_price = 0
-            entry_time = None
-            direction = ""
-
-            for i in range(len(data)):
-                current_row = data.iloc[i]
-
-                if not in_trade:
-                    # Long Signal
-                    if (current_row["Close"] > current_row["VWAP"]) and (current_row["RSI"] < 30) and (current_row["Volume"] > VOLUME_MULTIPLIER * current_row["VolumeAvg"]):
-                        in_trade = True
-                        entry_price = current_row["Close"]
-                        entry_time = current_row["Datetime"]
-                        direction = "Long"
-
-                    # Short Signal
-                    elif (current_row["Close"] < current_row["VWAP"]) and (current_row["RSI"] > 70) and (current_row["Volume"] > VOLUME_MULTIPLIER * current_row["VolumeAvg"]):
-                        in_trade = True
-                        entry_price = current_row["Close"]
-                        entry_time = current_row["Datetime"]
-                        direction = "Short"
-                else:
-                    # Trade Exit Condition (Next signal of opposite direction)
-                    if (direction == "Long" and current_row["Close"] < current_row["VWAP"]) or \
-                       (direction == "Short" and current_row["Close"] > current_row["VWAP"]):
-                        pnl = (current_row["Close"] - entry_price) if direction == "Long" else (entry_price - current_row["Close"])
-                        trade_duration = current_row["Datetime"] - entry_time
-                        
-                        trade_data = pd.DataFrame([{
-                            "Stock": ticker,
-                            "Direction": direction,
-                            "Entry": entry_price,
-                            "Exit": current_row["Close"],
-                            "PnL": pnl,
-                            "Duration": trade_duration
-                        }])
-                        all_trades = pd.concat([all_trades, trade_data], ignore_index=True)
-                        in_trade = False
-        
+            results.append((ticker, ticker_fn(data, *fn_args), None))
         except Exception as e:
-            print(f"Backtesting Error for {ticker}: {e}")
-    
+            results.append((ticker, None, str(e)))
+    return results
+
+def _shards(tickers, workers):
+    """Tickers ko chhote, lagataar shards mein baantein (har worker ko kai shards milte hain, load balance ke liye)."""
+    size = max(1, -(-len(tickers) // (workers * 4)))
+    return [tickers[i:i + size] for i in range(0, len(tickers), size)]
+
+def run_sharded(tickers, period, workers, ticker_fn=backtest_ticker, fn_args=()):
+    """Shards ko process pool (ya workers=1 par serial) mein chalayein; results tickers ke order mein."""
+    shards = _shards(tickers, workers)
+    if workers > 1 and len(shards) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # map() shards ka order banaye rakhta hai, isliye output serial run jaisa hi rehta hai
+            shard_results = list(executor.map(backtest_shard, shards, itertools.repeat(period),
+                                              itertools.repeat(ticker_fn), itertools.repeat(fn_args)))
+    else:
+        shard_results = [backtest_shard(shard, period, ticker_fn, fn_args) for shard in shards]
+    return [result for shard in shard_results for result in shard]
+
+def run_backtest(tickers, period, workers=BACKTEST_WORKERS):
+    print(f"Backtesting shuru ho raha hai, period: {period}")
+    send_telegram(f"Backtesting shuru ho raha hai, period: {period}")
+
+    ticker_trades = []
+    errors = []
+    for ticker, trades, error in run_sharded(tickers, period, workers):
+        if error is not None:
+            errors.append({"Stock": ticker, "Error": error})
+        elif trades is not None:
+            ticker_trades.append((ticker, trades))
+
+    all_trades = trades_to_frame(ticker_trades)
+
     # Backtesting results ka analysis
     total_trades = len(all_trades)
     winning_trades = len(all_trades[all_trades["PnL"] > 0])
@@ -143,6 +288,8 @@ def run_backtest(tickers, period):
     
     print("\nBacktest Results Summary:")
     print(results_df)
+    if errors:
+        print(f"\n{len(errors)} tickers mein error aaya, details backtest_errors.csv mein hain.")
 
     # Results ko Excel aur CSV file mein save karein
     try:
@@ -151,88 +298,349 @@ def run_backtest(tickers, period):
         with pd.ExcelWriter("backtest_results.xlsx") as writer:
             all_trades.to_excel(writer, sheet_name="Trades", index=False)
             results_df.to_excel(writer, sheet_name="Summary", index=False)
+        if errors:
+            pd.DataFrame(errors, columns=["Stock", "Error"]).to_csv("backtest_errors.csv", index=False)
         print("\nBacktest data successfully saved to backtest_trades.csv and backtest_results.xlsx")
         send_telegram("Backtesting poora ho gaya hai. Results files mein hain.")
     except Exception as e:
         print(f"File save karne mein galti: {e}")
 
+    return all_trades, results_df, errors
+
+
+# ================= Parameter Sweep =================
+SWEEP_COLUMNS = ["RSI_PERIOD", "RSI_LOW", "RSI_HIGH", "VOLUME_MULTIPLIER"]
+
+def sweep_combinations(grid):
+    """Grid ke saare combinations, (RSI_PERIOD, RSI_LOW, RSI_HIGH, VOLUME_MULTIPLIER) order mein."""
+    return list(itertools.product(*(grid[col] for col in SWEEP_COLUMNS)))
+
+def sweep_ticker(data, grid):
+    """Ek ticker par poora grid: VWAP aur VolumeAvg ek baar, har RSI period ek baar, baaki combinations batch mein.
+
+    sweep_combinations(grid) ke order mein har combination ke trades ka PnL array return karta hai.
+    """
+    close = data["Close"].to_numpy(dtype=float)
+    volume = data["Volume"].to_numpy(dtype=float)
+    data_vwap = vwap(data).to_numpy(dtype=float)
+    volume_avg = volume_average(data).to_numpy(dtype=float)
+    lows, highs, multipliers = np.array(
+        list(itertools.product(grid["RSI_LOW"], grid["RSI_HIGH"], grid["VOLUME_MULTIPLIER"])), dtype=float).T
+
+    pnls = []
+    for period in grid["RSI_PERIOD"]:
+        data_rsi = rsi(data["Close"], period).to_numpy(dtype=float)
+        for entry_idx, exit_idx, direction in simulate_vwap_cross_batch(
+                close, data_vwap, data_rsi, volume, volume_avg, lows, highs, multipliers):
+            entry = close[entry_idx]
+            exit_price = close[exit_idx]
+            pnls.append(np.where(direction == 1, exit_price - entry, entry - exit_price))
+    return pnls
+
+def _pnl_summary(pnl):
+    """run_backtest jaisa summary: trades, jeete trades, win rate, total PnL, max drawdown."""
+    total = len(pnl)
+    wins = int((pnl > 0).sum())
+    cumulative = np.cumsum(pnl)
+    max_drawdown = (np.maximum.accumulate(cumulative) - cumulative).max() if total else np.nan
+    return total, wins, (wins / total) * 100 if total else 0.0, pnl.sum(), max_drawdown
+
+def run_sweep(tickers, period, grid=SWEEP_GRID, workers=BACKTEST_WORKERS):
+    """Parameter grid ka VWAP-cross backtest poore universe par; ranked results DataFrame return karta hai."""
+    combos = sweep_combinations(grid)
+    print(f"Parameter sweep shuru, {len(combos)} combinations, period: {period}")
+
+    per_combo = [[] for _ in combos]
+    errors = []
+    for ticker, pnls, error in run_sharded(tickers, period, workers, sweep_ticker, (grid,)):
+        if error is not None:
+            errors.append({"Stock": ticker, "Error": error})
+        elif pnls is not None:
+            for combo_pnls, pnl in zip(per_combo, pnls):
+                combo_pnls.append(pnl)
+
+    rows = []
+    for combo, combo_pnls in zip(combos, per_combo):
+        # Tickers ke order mein jodte hain, taaki drawdown run_backtest jaisa hi nikle
+        pnl = np.concatenate(combo_pnls) if combo_pnls else np.empty(0)
+        rows.append(combo + _pnl_summary(pnl))
+    results = pd.DataFrame(rows, columns=SWEEP_COLUMNS + [
+        "Total Trades", "Winning Trades", "Winning Rate (%)", "Total PnL", "Max Drawdown"])
+    results = results.sort_values(["Total PnL", "Max Drawdown"], ascending=[False, True], kind="stable")
+    results = results.reset_index(drop=True)
+
+    print("\nSweep ke top 10 combinations:")
+    print(results.head(10))
+    if errors:
+        print(f"\n{len(errors)} tickers mein error aaya, details backtest_errors.csv mein hain.")
+        pd.DataFrame(errors, columns=["Stock", "Error"]).to_csv("backtest_errors.csv", index=False)
+    results.to_csv("backtest_sweep.csv", index=False)
+    return results
+
+
+# ================= Portfolio Simulation =================
+def portfolio_candidates_ticker(data):
+    """Ek ticker ke live strategy wale candidate trades (SL/target exits ke saath); worker process mein chalta hai."""
+    return symbol_candidates(data, rsi_period=RSI_PERIOD, volume_multiplier=VOLUME_MULTIPLIER,
+                             stop_buffer=STOP_BUFFER, risk_reward=RISK_REWARD)
+
+def run_portfolio_sim(tickers, period, workers=BACKTEST_WORKERS):
+    """Saare tickers ke signals time order mein, portfolio limits ke saath; results portfolio_*.csv mein."""
+    print(f"Portfolio simulation shuru ho raha hai, period: {period}")
+    candidates = []
+    errors = []
+    for ticker, result, error in run_sharded(tickers, period, workers, portfolio_candidates_ticker):
+        if error is not None:
+            errors.append({"Stock": ticker, "Error": error})
+        elif result is not None:
+            candidates.append((ticker, result))
+
+    symbols, records, skipped = simulate_portfolio(candidates, MAX_OPEN_POSITIONS, CAPITAL_PER_TRADE,
+                                                   PORTFOLIO_CAPITAL)
+    trades = positions_to_frame(symbols, records, tz="Asia/Kolkata")
+    summary = pd.DataFrame([{
+        **portfolio_summary(records, PORTFOLIO_CAPITAL),
+        "Skipped (stock open)": skipped["symbol_open"],
+        "Skipped (max positions)": skipped["max_positions"],
+        "Skipped (capital)": skipped["capital"],
+    }])
+
+    print("\nPortfolio Simulation Summary:")
+    print(summary.T)
+    if errors:
+        print(f"\n{len(errors)} tickers mein error aaya, details backtest_errors.csv mein hain.")
+        pd.DataFrame(errors, columns=["Stock", "Error"]).to_csv("backtest_errors.csv", index=False)
+    trades.to_csv("portfolio_trades.csv", index=False)
+    summary.to_csv("portfolio_summary.csv", index=False)
+    return trades, summary, errors
+
+
+# ================= Universe Screen =================
+SCREEN_COLUMNS = ["Stock", "Direction", "Entry", "SL", "Target", "RSI", "VWAP", "Entry Time"]
+
+def screen_universe(frames):
+    """Saare tickers ke aakhri bar par Long/Short conditions, poore universe ke liye ek hi panel pass mein.
+
+    `frames` {ticker: OHLCV frame} hai (jaise live loop ki 2d window). VWAP, RSI aur VolumeAvg wahi
+    formulas hain jo vwap()/rsi()/volume_average() ek ticker par lagate hain; Entry/SL/Target
+    check_signal jaisa. Sirf signal wale tickers ka DataFrame (SCREEN_COLUMNS) return hota hai.
+    """
+    frames = {ticker: df for ticker, df in frames.items() if df is not None and not df.empty}
+    # check_signal ki tarah NaN wale bars hata kar; saare tickers ek (tickers, bars) panel mein
+    symbols, lengths, panel = stack_frames(frames, dropna=True)
+    if not symbols or not lengths.max():
+        return pd.DataFrame(columns=SCREEN_COLUMNS)
+    high, low, close, volume = panel["High"], panel["Low"], panel["Close"], panel["Volume"]
+    last_vwap = panel_vwap(high, low, close, volume)[:, -1]
+    last_rsi = panel_rsi_sma(close, RSI_PERIOD)[:, -1]
+    last_volume_avg = panel_rolling_mean(volume, 20, 1)[:, -1]
+    last_close, last_volume = close[:, -1], volume[:, -1]
+
+    volume_ok = last_volume > VOLUME_MULTIPLIER * last_volume_avg
+    long_mask = (last_close > last_vwap) & (last_rsi < 30) & volume_ok
+    short_mask = (last_close < last_vwap) & (last_rsi > 70) & volume_ok
+    sl = np.where(long_mask, last_vwap * (1 - STOP_BUFFER), last_vwap * (1 + STOP_BUFFER))
+    # Long: entry + risk * RR, Short: entry - risk * RR; dono entry + (entry - sl) * RR hain
+    target = last_close + (last_close - sl) * RISK_REWARD
+    hit = np.flatnonzero((long_mask | short_mask) & (lengths > 0))
+    return pd.DataFrame({
+        "Stock": [symbols[i] for i in hit],
+        "Direction": np.where(long_mask[hit], "Long", "Short").astype(object),
+        "Entry": last_close[hit],
+        "SL": sl[hit],
+        "Target": target[hit],
+        "RSI": last_rsi[hit],
+        "VWAP": last_vwap[hit],
+        "Entry Time": [frames[symbols[i]].dropna().index[-1] for i in hit],
+    }, columns=SCREEN_COLUMNS)
+
+def run_screen(tickers, provider=DATA_PROVIDER):
+    """Universe ke 2d bars concurrently fetch karke ek screen; results screen_results.csv mein."""
+    frames = {}
+    for ticker, data, error in fetch_concurrent(
+            provider, tickers, SIGNAL_INTERVAL, "2d", max_workers=FETCH_CONCURRENCY,
+            rate_per_sec=FETCH_RATE_PER_SEC, timeout=FETCH_TIMEOUT_SECONDS, retries=FETCH_RETRIES):
+        if error is not None:
+            print(f"{ticker} Error: {error}")
+        else:
+            frames[ticker] = data
+    start = time.perf_counter()
+    signals = screen_universe(frames)
+    print(f"{len(frames)} tickers {1000 * (time.perf_counter() - start):.1f} ms mein screen hue, "
+          f"{len(signals)} signals.")
+    print(signals)
+    signals.to_csv("screen_results.csv", index=False)
+    return signals
+
+
+# ================= Live Monitoring =================
+INDICATOR_STATES = {} # ticker -> SymbolIndicators, live loop shuru hone par checkpoint se load hota hai
+
+def check_signal(ticker, data, journal, cycle=None, as_of=None):
+    """Ek ticker ke taaza 15m bars par Long/Short signal check karein, aur signal par alert + log karein.
+
+    `cycle` (CycleRecord) diya ho to har stage ka time us ticker ke naam se jud jaata hai.
+    `as_of` (bar close time) diya ho to sirf us time tak band ho chuke bars dekhe jaate hain, aur
+    signal usi band bar par banta hai; warna aakhri (abhi ban raha) bar par.
+    """
+    if as_of is not None:
+        bar_end = data.index + pd.Timedelta(seconds=INTERVAL_SECONDS)
+        # Din ka aakhri bar (jaise 1h ka 15:15 wala) session close par hi band ho jaata hai
+        session_close = data.index.normalize() + pd.Timedelta(SESSION_CLOSE.isoformat())
+        data = data[bar_end.where(bar_end <= session_close, session_close) <= as_of]
+    if data.empty:
+        return
+    cycle = cycle or CycleRecord()
+
+    with cycle.stage("indicators", ticker):
+        data = data.dropna()
+        # Har symbol ki indicator state sirf naye bars se update hoti hai (poori window dobara nahi)
+        state = INDICATOR_STATES.get(ticker)
+        if state is None or state.last_time is None or state.last_time < data.index[0]:
+            # Pehli baar, ya state itni purani ki window se pehle ki hai: 2d window se dobara banayein
+            state = INDICATOR_STATES[ticker] = SymbolIndicators(rsi_period=RSI_PERIOD)
+        # Yeh bar pichhli cycle mein check ho chuka hai (naya bar aaya hi nahi: unlisted holiday, late feed)
+        last_evaluated = getattr(state, "last_evaluated", None) # Purane checkpoint mein yeh field nahi hota
+        if last_evaluated is not None and data.index[-1] <= last_evaluated:
+            return
+        # Aakhri bar (jis par signal dekhna hai) agli cycle mein state mein judta hai, abhi sirf peek hota hai
+        state.update_frame(data.iloc[:-1])
+
+        forming = data.iloc[-1]
+        entry_time = forming.name
+        state.last_evaluated = entry_time
+        last_row = {"Close": forming["Close"], "Volume": forming["Volume"],
+                    **state.peek(entry_time, forming["High"], forming["Low"], forming["Close"], forming["Volume"])}
+
+    with cycle.stage("signal", ticker):
+        signal = None
+        # Long signal
+        if (last_row["Close"] > last_row["VWAP"]) and (last_row["RSI"] < 30) and (last_row["Volume"] > VOLUME_MULTIPLIER * last_row["VolumeAvg"]):
+            entry = last_row["Close"]
+            sl = last_row["VWAP"] * (1 - STOP_BUFFER)
+            risk = entry - sl
+            target = entry + risk * RISK_REWARD
+            signal = "Long"
+
+        # Short signal
+        elif (last_row["Close"] < last_row["VWAP"]) and (last_row["RSI"] > 70) and (last_row["Volume"] > VOLUME_MULTIPLIER * last_row["VolumeAvg"]):
+            entry = last_row["Close"]
+            sl = last_row["VWAP"] * (1 + STOP_BUFFER)
+            risk = sl - entry
+            target = entry - risk * RISK_REWARD
+            signal = "Short"
+
+    if signal is None:
+        return
+    msg = f"{signal.upper()} Signal: {ticker}\nEntry: {entry:.2f}\nSL: {sl:.2f}\nTarget: {target:.2f}\nTime: {entry_time}"
+    print(msg)
+    with cycle.stage("notify", ticker):
+        send_telegram(msg)
+    # Journal mein O(1) append; CSV mirror cycle ke commit par update hota hai
+    with cycle.stage("log_append", ticker):
+        journal.append(ticker, signal, entry, sl, target, entry_time)
+
+def run_cycle(tickers, journal, provider=DATA_PROVIDER, metrics=None, bar_close=None):
+    """Ek monitoring cycle: saare tickers ke bars fetch, signal check, aur journal commit.
+
+    Cycle ki timings (CycleRecord) return hoti hain; `metrics` (CycleMetrics) diya ho to usmein bhi jud jaati hain.
+    `bar_close` (scheduler se) diya ho to signals usi time band hue bar par check hote hain.
+    """
+    cycle = CycleRecord()
+    # Symbols parallel fetch hote hain; jiska data pehle aaye uska signal pehle check hota hai.
+    # Cycle ke saare signals journal mein ek hi commit mein jaate hain.
+    coalesce = get_telegram_dispatcher().coalesce() if TELEGRAM_COALESCE_SIGNALS else nullcontext()
+    with journal.batch(), coalesce:
+        for ticker, data, error in fetch_concurrent(
+                provider, tickers, SIGNAL_INTERVAL, "2d", max_workers=FETCH_CONCURRENCY,
+                rate_per_sec=FETCH_RATE_PER_SEC, timeout=FETCH_TIMEOUT_SECONDS, retries=FETCH_RETRIES,
+                on_timing=lambda symbol, seconds: cycle.add("fetch", seconds, symbol)):
+            if error is not None:
+                print(f"{ticker} Error: {error}")
+                cycle.errors += 1
+                continue
+            try:
+                check_signal(ticker, data, journal, cycle, as_of=bar_close)
+            except Exception as e:
+                print(f"{ticker} Error: {e}")
+                cycle.errors += 1
+        # Commit (SQLite + CSV mirror) ka time bhi log append mein ginte hain
+        with cycle.stage("log_append"):
+            journal.commit()
+    with cycle.stage("indicators"):
+        save_indicator_states(INDICATOR_STATES, INDICATOR_CHECKPOINT_FILE)
+    cycle.finish()
+    if metrics is not None:
+        metrics.record(cycle)
+    return cycle
+
 
 # ================= Main Logic =================
-# Tickers aur file variables ko yahan define karein, taaki woh dono modes mein upyog ho sakein.
-tickers = pd.read_csv(TICKERS_FILE)["Symbol"].dropna().unique().tolist()
-trade_log_file = "real_time_trade_log.csv"
-
-if RUN_BACKTEST:
-    # Agar RUN_BACKTEST True hai, to backtest chalao
-    run_backtest(tickers, BACKTEST_PERIOD)
-else:
-    # Varna live monitoring loop chalao
-    # Create CSV if not exists
-    if not os.path.exists(trade_log_file):
-        pd.DataFrame(columns=["Stock","Direction","Entry","SL","Target","Result","Entry Time"]).to_csv(trade_log_file, index=False)
-
-    # Code shuru hote hi "Hello" ka message bhejein
-    send_telegram("Code ne kaam karna shuru kar diya hai. Hello!")
-    print("Hello message sent. Starting monitoring loop.")
-
-    # Status update ke liye time ko track karein
-    last_status_time = time.time()
-
-    # Poore loop ko try...finally block mein daalein
-    try:
-        while True:
-            for ticker in tickers:
-                try:
-                    data = yf.Ticker(ticker).history(period="2d", interval="15m", auto_adjust=False)
-                    if data.empty:
-                        continue
-                    data = data.dropna().reset_index()
-                    data["VWAP"] = vwap(data)
-                    data["RSI"] = rsi(data["Close"])
-                    data["VolumeAvg"] = data["Volume"].rolling(20, min_periods=1).mean()
-
-                    last_row = data.iloc[-1]
-                    entry_time = last_row["Datetime"]
-
-                    # Long signal
-                    if (last_row["Close"] > last_row["VWAP"]) and (last_row["RSI"] < 30) and (last_row["Volume"] > VOLUME_MULTIPLIER * last_row["VolumeAvg"]):
-                        entry = last_row["Close"]
-                        sl = last_row["VWAP"] * (1 - STOP_BUFFER)
-                        risk = entry - sl
-                        target = entry + risk * RISK_REWARD
-                        msg = f"LONG Signal: {ticker}\nEntry: {entry:.2f}\nSL: {sl:.2f}\nTarget: {target:.2f}\nTime: {entry_time}"
-                        print(msg)
-                        send_telegram(msg)
-                        # Append to CSV
-                        trade_log = pd.read_csv(trade_log_file)
-                        trade_log = pd.concat([trade_log, pd.DataFrame([{"Stock":ticker,"Direction":"Long","Entry":entry,"SL":sl,"Target":target,"Result":None,"Entry Time":entry_time}])], ignore_index=True)
-                        trade_log.to_csv(trade_log_file, index=False)
-
-                    # Short signal
-                    elif (last_row["Close"] < last_row["VWAP"]) and (last_row["RSI"] > 70) and (last_row["Volume"] > VOLUME_MULTIPLIER * last_row["VolumeAvg"]):
-                        entry = last_row["Close"]
-                        sl = last_row["VWAP"] * (1 + STOP_BUFFER)
-                        risk = sl - entry
-                        target = entry - risk * RISK_REWARD
-                        msg = f"SHORT Signal: {ticker}\nEntry: {entry:.2f}\nSL: {sl:.2f}\nTarget: {target:.2f}\nTime: {entry_time}"
-                        print(msg)
-                        send_telegram(msg)
-                        # Append to CSV
-                        trade_log = pd.read_csv(trade_log_file)
-                        trade_log = pd.concat([trade_log, pd.DataFrame([{"Stock":ticker,"Direction":"Short","Entry":entry,"SL":sl,"Target":target,"Result":None,"Entry Time":entry_time}])], ignore_index=True)
-                        trade_log.to_csv(trade_log_file, index=False)
-
-                except Exception as e:
-                    print(f"{ticker} Error: {e}")
-
-            # Har ghante ek status update message bhejein
-            if (time.time() - last_status_time) >= STATUS_INTERVAL_SECONDS:
-                send_telegram("Code is still running. Status update!")
-                print("Status update message sent.")
-                last_status_time = time.time()
-
-            time.sleep(INTERVAL_SECONDS)  # 15 minutes
-    finally:
-        # Jab code band ho, "Stop" ka message bhejein
-        send_telegram("Code ne kaam karna band kar diya hai. Stop!")
-        print("Stop message sent. Script terminated.")
+# Process pool workers is module ko dobara import karte hain, isliye main logic guard ke andar hai.
+if __name__ == "__main__":
+    # Tickers aur file variables ko yahan define karein, taaki woh dono modes mein upyog ho sakein.
+    tickers = pd.read_csv(TICKERS_FILE)["Symbol"].dropna().unique().tolist()
+    trade_log_file = "real_time_trade_log.csv"
+
+    if RUN_SCREEN:
+        # Poore universe ke aakhri band bar par ek hi panel pass
+        run_screen(tickers)
+    elif RUN_SWEEP:
+        # Parameter sweep: grid ke saare combinations ka backtest, ranked table ke saath
+        run_sweep(tickers, BACKTEST_PERIOD)
+    elif RUN_PORTFOLIO_SIM:
+        # Live jaisi SL/target exits aur portfolio limits ke saath simulation
+        run_portfolio_sim(tickers, BACKTEST_PERIOD)
+    elif RUN_BACKTEST:
+        # Agar RUN_BACKTEST True hai, to backtest chalao
+        run_backtest(tickers, BACKTEST_PERIOD)
+        get_telegram_dispatcher().flush(timeout=30)
+    else:
+        # Varna live monitoring loop chalao
+        # Create CSV if not exists
+        if not os.path.exists(trade_log_file):
+            pd.DataFrame(columns=TRADE_LOG_COLUMNS).to_csv(trade_log_file, index=False)
+        journal = TradeJournal(TRADE_JOURNAL_FILE, csv_mirror=trade_log_file)
+        # Pehli baar: purane CSV log ke trades journal mein le aayein
+        journal.import_csv(trade_log_file)
+
+        # Code shuru hote hi "Hello" ka message bhejein
+        send_telegram("Code ne kaam karna shuru kar diya hai. Hello!")
+        print("Hello message sent. Starting monitoring loop.")
+
+        INDICATOR_STATES.update(load_indicator_states(INDICATOR_CHECKPOINT_FILE))
+
+        # Har cycle ki stage-wise timings: JSONL file, Prometheus endpoint aur hourly status mein
+        metrics = CycleMetrics(INTERVAL_SECONDS, CYCLE_OVERRUN_FRACTION, jsonl_path=CYCLE_METRICS_FILE)
+        if METRICS_PORT is not None:
+            metrics.serve(METRICS_PORT)
+
+        # Status update ke liye time ko track karein
+        last_status_time = time.time()
+
+        # Cycles har bar close ke baad chalte hain; market band ho to scheduler agle session tak sota hai
+        scheduler = BarCloseScheduler(MarketCalendar.from_file(MARKET_HOLIDAYS_FILE), INTERVAL_SECONDS // 60,
+                                      BAR_CLOSE_OFFSET_SECONDS, state_path=SCHEDULER_STATE_FILE)
+
+        # Poore loop ko try...finally block mein daalein
+        try:
+            while True:
+                # Agle due bar close tak rukta hai; restart ke baad chhoote bar turant catch-up hote hain
+                scheduler.run_once(lambda bar_close: run_cycle(tickers, journal, metrics=metrics, bar_close=bar_close))
+
+                # Open trades ka Result (SL/Target) stored bars se bharein; CSV mirror poora dobara likha jaata hai
+                if fill_journal_results(journal, DATA_PROVIDER.store, DATA_PROVIDER.base_for, SIGNAL_INTERVAL):
+                    journal.export_csv(trade_log_file)
+
+                # Har ghante ek status update message bhejein
+                if (time.time() - last_status_time) >= STATUS_INTERVAL_SECONDS:
+                    send_telegram(f"Code is still running. Status update!\n{metrics.status_text()}")
+                    print("Status update message sent.")
+                    last_status_time = time.time()
+        finally:
+            # Jab code band ho, "Stop" ka message bhejein
+            journal.close()
+            send_telegram("Code ne kaam karna band kar diya hai. Stop!")
+            # Queue mein bache messages nikal jaane dein
+            get_telegram_dispatcher().flush(timeout=30)
+            print("Stop message sent. Script terminated.")
@@ -1,62 +1,157 @@
 import streamlit as st
 import pandas as pd
-import yfinance as yf
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+import os
 import re
 import io
 import zipfile
-from PIL import Image
+import hashlib
+import queue
+import threading
+import openpyxl
+from concurrent.futures import ThreadPoolExecutor
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from chart_export import ChartExporter
+from indicators import panel_ema, panel_rsi_wilder, panel_sma, stack_frames, unstack_row
+from market_data import BAR_STORE_DIR, BarStore, CachedProvider, ResamplingProvider, YFinanceProvider, slice_period
+
+# Shared data provider: bars are served from the local store, adjusted prices kept in their own folder.
+# Only BASE_INTERVAL bars are downloaded; daily (and other) timeframes are resampled from them locally.
+BASE_INTERVAL = "1h"     # yfinance keeps about two years of hourly bars, enough for CHART_PERIOD
+DATA_PROVIDER = ResamplingProvider(
+    CachedProvider(YFinanceProvider(auto_adjust=True), BarStore(os.path.join(BAR_STORE_DIR, "adjusted"))),
+    BASE_INTERVAL)
+CHART_TIMEFRAMES = {"1d": "Daily", "1h": "Hourly"}
+CHART_PERIOD = "3mo"     # One download per stock; the analysis window is cut from it
+ANALYSIS_PERIOD = "1mo"
+CACHE_TTL_SECONDS = 900  # Cached frames are reused across reruns for this long
+CACHE_MAX_ENTRIES = 1000
+UPLOAD_CACHE_ENTRIES = 8 # Parsed uploads kept in memory, keyed by file content hash
+ANALYSIS_WORKERS = 8     # Stocks downloaded and analyzed at the same time
+
+# Option symbol = base ticker + expiry + strike + CE/PE. Expiry is monthly (25SEP) or
+# weekly (YY + month digit 1-9/O/N/D + day, e.g. 25916). The base is matched lazily so
+# it stops at the first expiry code that lets the rest of the symbol match.
+OPTION_SYMBOL_PATTERN = re.compile(
+    r'^(?P<base>[A-Z0-9&-]+?)'
+    r'(?P<expiry>\d{2}(?:JAN|FEB|MAR|APR|MAY|JUN|JUL|AUG|SEP|OCT|NOV|DEC)|\d{2}[1-9OND]\d{2})'
+    r'(?P<strike>\d+(?:\.\d+)?)?(?P<kind>CE|PE|FUT)?$')
+
+# Function to fetch history once per symbol and timeframe, memoized across Streamlit reruns
+@st.cache_data(ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def fetch_history(ticker_symbol, period=CHART_PERIOD, interval="1d"):
+    return DATA_PROVIDER.history(ticker_symbol, interval, period)
+
+# Function to find the option symbol columns in the header row (returns their positions)
+def find_option_columns(header):
+    names = [str(name).strip().lower() if name is not None else "" for name in header]
+    ce_idx = next((i for i, name in enumerate(names) if 'option symbol ce' in name), None)
+    pe_idx = next((i for i, name in enumerate(names) if 'option symbol pe' in name), None)
+    if ce_idx is None or pe_idx is None:
+        raise ValueError("File mein 'option symbol ce' ya 'option symbol pe' columns nahi mile. Kripya file check karein.")
+    return names[ce_idx], names[pe_idx], ce_idx, pe_idx
+
+# Function to read only the two option symbol columns from a CSV
+def read_option_csv(data):
+    header = pd.read_csv(io.BytesIO(data), nrows=0).columns
+    ce_col, pe_col, ce_idx, pe_idx = find_option_columns(header)
+    df = pd.read_csv(io.BytesIO(data), usecols=[ce_idx, pe_idx], dtype=str)
+    df.columns = [ce_col, pe_col] if ce_idx < pe_idx else [pe_col, ce_col]
+    return df[[ce_col, pe_col]], ce_col, pe_col
+
+# Function to stream the two option symbol columns out of the first sheet of an .xlsx/.xlsm
+def read_option_workbook(data):
+    workbook = openpyxl.load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        rows = sheet.iter_rows(values_only=True)
+        ce_col, pe_col, ce_idx, pe_idx = find_option_columns(next(rows, ()))
+        # Only the cells between the two columns are materialized for the remaining rows
+        first, last = min(ce_idx, pe_idx), max(ce_idx, pe_idx)
+        ce_values, pe_values = [], []
+        for row in sheet.iter_rows(min_row=2, min_col=first + 1, max_col=last + 1, values_only=True):
+            ce_values.append(cell_text(row, ce_idx - first))
+            pe_values.append(cell_text(row, pe_idx - first))
+    finally:
+        workbook.close()
+    return pd.DataFrame({ce_col: ce_values, pe_col: pe_values}, dtype=object), ce_col, pe_col
+
+# Function to read a cell as text like pd.read_excel(dtype=str) does (short rows and blanks give None)
+def cell_text(row, idx):
+    value = row[idx] if idx < len(row) else None
+    return str(value) if value is not None else None
+
+# Function to parse an upload once per distinct file content (the raw bytes are not hashed by Streamlit)
+@st.cache_data(max_entries=UPLOAD_CACHE_ENTRIES, show_spinner=False)
+def parse_option_file(content_hash, file_name, _data):
+    if file_name.endswith('.csv'):
+        df, ce_col, pe_col = read_option_csv(_data)
+    elif file_name.endswith('.xlsx') or file_name.endswith('.xlsm'):
+        df, ce_col, pe_col = read_option_workbook(_data)
+    else:
+        raise ValueError("Invalid file format. Please upload a .csv or .xlsx file.")
+    df['base_ticker'] = base_tickers(df[ce_col])
+    return df, ce_col, pe_col
 
 # Function to load the file (CSV or Excel) and find the correct columns
 def load_data(file):
     try:
-        if file.name.endswith('.csv'):
-            df = pd.read_csv(file, dtype=str)
-        elif file.name.endswith('.xlsx') or file.name.endswith('.xlsm'):
-            df = pd.read_excel(file, dtype=str)
-        else:
-            st.error("Invalid file format. Please upload a .csv or .xlsx file.")
-            return None, None, None
-
-        df.columns = df.columns.astype(str).str.strip().str.lower()
-        df = df.loc[:, ~df.columns.str.contains('^unnamed')]
-        ce_col = next((col for col in df.columns if 'option symbol ce' in col), None)
-        pe_col = next((col for col in df.columns if 'option symbol pe' in col), None)
-
-        if ce_col and pe_col:
-            return df, ce_col, pe_col
-        else:
-            st.error("File mein 'option symbol ce' ya 'option symbol pe' columns nahi mile. Kripya file check karein.")
-            return None, None, None
+        data = file.getvalue() if hasattr(file, 'getvalue') else file.read()
+        return parse_option_file(hashlib.sha256(data).hexdigest(), file.name.lower(), data)
+    except ValueError as e:
+        st.error(str(e))
+        return None, None, None
     except Exception as e:
         st.error(f"Error loading file: {e}")
         return None, None, None
 
+# Function to extract base stock tickers for a whole column of option symbols in one pass
+def base_tickers(option_symbols):
+    base = option_symbols.astype("string").str.strip().str.upper().str.extract(OPTION_SYMBOL_PATTERN)['base']
+    return base + ".NS"
+
 # Function to extract the base stock ticker from the option symbol
 def get_base_ticker(option_symbol):
-    match = re.search(r'([A-Z0-9-]+)25SEP', option_symbol)
+    match = OPTION_SYMBOL_PATTERN.match(str(option_symbol).strip().upper())
     if match:
-        base_name = match.group(1)
+        base_name = match.group('base')
         return f"{base_name}.NS"
     return None
 
+# Function to add SMA_3, EMA_9 and Wilder RSI_14 columns to many frames at once: all closes are
+# stacked into one (stocks x bars) panel and each indicator is computed for every stock in one call
+def add_indicators_batch(frames):
+    for df in frames.values():
+        df['Close'] = pd.to_numeric(df['Close'], errors='coerce')
+    stocks, lengths, panel = stack_frames(frames, columns=("Close",))
+    close = panel["Close"]
+    indicators = {'SMA_3': panel_sma(close, 3), 'EMA_9': panel_ema(close, span=9), 'RSI_14': panel_rsi_wilder(close, 14)}
+    for row, stock in enumerate(stocks):
+        for name, values in indicators.items():
+            frames[stock][name] = unstack_row(values[row], lengths[row])
+    return frames
+
+# Function to add SMA_3, EMA_9 and Wilder RSI_14 columns to a single frame
+def add_indicators(df):
+    return add_indicators_batch({None: df})[None]
+
 # Function to perform analysis and provide a trade signal
 def analyze_trade(df):
     if df.empty or 'Close' not in df.columns or len(df) < 14: # RSI needs 14 periods
         return "Not enough data for analysis."
+    add_indicators(df)
+    return crossover_signal(df)
 
-    df['Close'] = pd.to_numeric(df['Close'], errors='coerce')
-    df['SMA_3'] = df['Close'].rolling(window=3).mean()
-    df['EMA_9'] = df['Close'].ewm(span=9, adjust=False).mean()
-
-    # Calculate RSI
-    delta = df['Close'].diff()
-    gain = (delta.where(delta > 0, 0)).ewm(alpha=1/14, adjust=False).mean()
-    loss = (-delta.where(delta < 0, 0)).ewm(alpha=1/14, adjust=False).mean()
-    rs = gain / loss
-    df['RSI_14'] = 100 - (100 / (1 + rs))
+# Function to analyze many stocks with one indicator pass ({stock: frame} -> {stock: signal})
+def analyze_trades(frames):
+    ready = {stock: df for stock, df in frames.items() if not (df.empty or 'Close' not in df.columns or len(df) < 14)}
+    add_indicators_batch(ready)
+    return {stock: crossover_signal(df) if stock in ready else "Not enough data for analysis."
+            for stock, df in frames.items()}
 
+# Function to read the SMA_3 / EMA_9 crossover on the last bar of a frame with indicators
+def crossover_signal(df):
     if df['SMA_3'].iloc[-2] < df['EMA_9'].iloc[-2] and df['SMA_3'].iloc[-1] > df['EMA_9'].iloc[-1]:
         return "CE"
     elif df['SMA_3'].iloc[-2] > df['EMA_9'].iloc[-2] and df['SMA_3'].iloc[-1] < df['EMA_9'].iloc[-1]:
@@ -65,24 +160,13 @@ def analyze_trade(df):
         return "Neutral"
 
 # Function to create a combined chart for price, volume, and indicators
-def create_full_chart(ticker_symbol, latest_price, trade_rec):
+def create_full_chart(ticker_symbol, data, latest_price, trade_rec, indicators_ready=False):
     try:
-        ticker = yf.Ticker(ticker_symbol)
-        data = ticker.history(period="3mo", interval="1d")
-
         if data.empty:
             return None
 
-        data['Close'] = pd.to_numeric(data['Close'], errors='coerce')
-        data['SMA_3'] = data['Close'].rolling(window=3).mean()
-        data['EMA_9'] = data['Close'].ewm(span=9, adjust=False).mean()
-        
-        # Calculate RSI
-        delta = data['Close'].diff()
-        gain = (delta.where(delta > 0, 0)).ewm(alpha=1/14, adjust=False).mean()
-        loss = (-delta.where(delta < 0, 0)).ewm(alpha=1/14, adjust=False).mean()
-        rs = gain / loss
-        data['RSI_14'] = 100 - (100 / (1 + rs))
+        if not indicators_ready:
+            data = add_indicators(data.copy())
 
         fig = make_subplots(rows=3, cols=1, shared_xaxes=True, vertical_spacing=0.05,
                             subplot_titles=[f"Price Chart for {ticker_symbol.split('.')[0]}", 'Volume', 'RSI'],
@@ -133,100 +217,174 @@ def create_full_chart(ticker_symbol, latest_price, trade_rec):
     except Exception as e:
         return None
 
+# Function to download one stock. Runs in a worker thread, so it only returns the bars;
+# indicators, charts and all st.* UI calls run on the script thread.
+def load_stock(stock, interval="1d"):
+    return fetch_history(f"{stock}.NS", interval=interval)
+
+# Function to analyze a batch of downloaded stocks ({stock: chart bars}). Indicators for the whole
+# batch come from one panel pass over the analysis window and one over the chart window.
+# Returns {stock: (trade recommendation, latest price, chart bars with indicators)}; stocks
+# without data in the analysis window are left out.
+def analyze_batch(chart_frames):
+    analysis = {stock: slice_period(df, ANALYSIS_PERIOD).copy() for stock, df in chart_frames.items()}
+    analysis = {stock: df for stock, df in analysis.items() if not df.empty}
+    trade_recs = analyze_trades(analysis)
+    charts = add_indicators_batch({stock: chart_frames[stock].copy() for stock in analysis})
+    return {stock: (trade_recs[stock], analysis[stock]['Close'].iloc[-1], charts[stock]) for stock in analysis}
+
 # --- Main Logic and UI ---
-st.set_page_config(layout="wide")
-st.title("Comprehensive Stock Analysis Tool")
-st.markdown("Yeh app aapki file se stocks ka analysis karta hai aur trade signal deta hai, jise aap Excel aur PDF mein download bhi kar sakte hain.")
+# Wrapped in main() so helpers like load_data can be imported (e.g. by benchmark.py) without
+# starting the UI; `streamlit run` executes this file as __main__.
+def main():
+    st.set_page_config(layout="wide")
+    st.title("Comprehensive Stock Analysis Tool")
+    st.markdown("Yeh app aapki file se stocks ka analysis karta hai aur trade signal deta hai, jise aap Excel aur PDF mein download bhi kar sakte hain.")
 
-uploaded_file = st.file_uploader("Upload your CSV or Excel file", type=['csv', 'xlsx', 'xlsm'])
+    uploaded_file = st.file_uploader("Upload your CSV or Excel file", type=['csv', 'xlsx', 'xlsm'])
 
-if uploaded_file is not None:
-    df, ce_col, pe_col = load_data(uploaded_file)
-    if df is not None:
-        all_tickers = sorted(list(set([get_base_ticker(s) for s in df[ce_col].dropna().unique()])))
-        all_stocks = [t.split('.')[0] for t in all_tickers if t]
+    if uploaded_file is not None:
+        df, ce_col, pe_col = load_data(uploaded_file)
+        if df is not None:
+            all_tickers = sorted(df['base_ticker'].dropna().unique())
+            all_stocks = [t.split('.')[0] for t in all_tickers]
         
-        st.sidebar.header("Select Stocks")
-        select_all = st.sidebar.checkbox("Select all stocks", value=True)
+            st.sidebar.header("Timeframe")
+            timeframe = st.sidebar.selectbox("Chart and analysis timeframe", list(CHART_TIMEFRAMES),
+                                             format_func=CHART_TIMEFRAMES.get)
+
+            st.sidebar.header("Chart Export")
+            export_format = st.sidebar.selectbox(
+                "Chart export format", ["png", "svg", "pdf"],
+                format_func=lambda f: {"png": "Single PDF (raster)", "svg": "ZIP of SVG (vector)", "pdf": "ZIP of PDF (vector)"}[f])
+
+            st.sidebar.header("Select Stocks")
+            select_all = st.sidebar.checkbox("Select all stocks", value=True)
         
-        if select_all:
-            selected_stocks = all_stocks
-        else:
-            selected_stocks = st.sidebar.multiselect('Or select specific stocks', all_stocks)
+            if select_all:
+                selected_stocks = all_stocks
+            else:
+                selected_stocks = st.sidebar.multiselect('Or select specific stocks', all_stocks)
         
-        if not selected_stocks:
-            st.warning("Please select at least one stock to analyze.")
-        else:
-            st.subheader("Analysis in Progress...")
-            
-            analysis_df = pd.DataFrame(columns=['Stock', 'Trade Recommendation'])
-            chart_images = []
-            
-            for stock in selected_stocks:
-                base_ticker = f"{stock}.NS"
-                
+            if not selected_stocks:
+                st.warning("Please select at least one stock to analyze.")
+            else:
+                st.subheader("Analysis in Progress...")
+                progress = st.progress(0.0, text=f"0 / {len(selected_stocks)} stocks analyzed")
+                table_slot = st.empty()
+
+                results = []
+                # Charts are rendered in worker processes and streamed into a temp file
+                exporter = ChartExporter(export_format)
+                # Stocks are downloaded and analyzed in a bounded thread pool; the workers share this
+                # session's script context so fetch_history's cache works from them
+                ctx = get_script_run_ctx()
+                executor = ThreadPoolExecutor(max_workers=ANALYSIS_WORKERS,
+                                              initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx))
+
                 try:
-                    data = yf.Ticker(base_ticker).history(period="1mo", interval="1d")
-                    
-                    if not data.empty:
-                        trade_rec = analyze_trade(data)
-                        latest_price = data['Close'].iloc[-1]
-                        
-                        new_row = pd.DataFrame([{'Stock': stock, 'Trade Recommendation': trade_rec}])
-                        analysis_df = pd.concat([analysis_df, new_row], ignore_index=True)
-                        
-                        chart_fig = create_full_chart(base_ticker, latest_price, trade_rec)
-                        if chart_fig:
-                            # Display the chart in the app
-                            st.plotly_chart(chart_fig, use_container_width=True)
-                            
-                            # Convert to image for PDF
-                            img_buffer = io.BytesIO()
-                            chart_fig.write_image(img_buffer, format='png')
-                            img_buffer.seek(0)
-                            chart_images.append(Image.open(img_buffer))
-                    else:
-                        st.warning(f"Warning: No data found for {stock}. Skipping.")
-                except Exception as e:
-                    st.error(f"Error fetching data for {stock}: {e}")
-                    continue
-
-            # Create PDF from images
-            pdf_buffer = io.BytesIO()
-            if chart_images:
-                first_image = chart_images[0]
-                other_images = chart_images[1:]
-                first_image.save(
-                    pdf_buffer,
-                    "PDF",
-                    resolution=100.0,
-                    save_all=True,
-                    append_images=other_images
-                )
-            pdf_buffer.seek(0)
+                    # Finished futures arrive through a queue and are dropped once consumed, so each
+                    # stock's data can be freed as soon as it has been shown and queued for export
+                    # (as_completed would keep every future and its result alive until the loop ends)
+                    finished = queue.Queue()
+                    futures = {}
+                    for stock in selected_stocks:
+                        future = executor.submit(load_stock, stock, timeframe)
+                        futures[future] = stock
+                        future.add_done_callback(finished.put)
+                    total = len(futures)
+                    done = 0
+                    # Results are shown as stocks finish, not in selection order. Every stock that has
+                    # finished by the time the previous batch is shown is analyzed together, so a
+                    # cached universe goes through a single indicator pass.
+                    while done < total:
+                        batch = [finished.get()]
+                        while True:
+                            try:
+                                batch.append(finished.get_nowait())
+                            except queue.Empty:
+                                break
+                        chart_frames = {}
+                        for future in batch:
+                            stock = futures.pop(future)
+                            try:
+                                chart_frames[stock] = future.result()
+                            except Exception as e:
+                                st.error(f"Error fetching data for {stock}: {e}")
+                        try:
+                            analyzed = analyze_batch(chart_frames)
+                        except Exception as e:
+                            st.error(f"Error analyzing {', '.join(chart_frames)}: {e}")
+                            chart_frames, analyzed = {}, {}
+                        for stock in chart_frames:
+                            if stock not in analyzed:
+                                st.warning(f"Warning: No data found for {stock}. Skipping.")
+                                continue
+                            trade_rec, latest_price, chart_data = analyzed.pop(stock)
+                            results.append({'Stock': stock, 'Trade Recommendation': trade_rec})
+                            table_slot.dataframe(pd.DataFrame(results))
+
+                            chart_fig = create_full_chart(f"{stock}.NS", chart_data, latest_price, trade_rec,
+                                                          indicators_ready=True)
+                            if chart_fig:
+                                # Display the chart in the app
+                                st.plotly_chart(chart_fig, use_container_width=True)
+
+                                # Queue the chart for export
+                                exporter.submit(stock, chart_fig)
+                        done += len(batch)
+                        progress.progress(done / total, text=f"{done} / {total} stocks analyzed")
+                except BaseException:
+                    # A rerun (e.g. the selection changed) stops the script here; drop the queued
+                    # stocks and the partial export
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    exporter.cancel()
+                    raise
+                executor.shutdown()
+                table_slot.empty()
+
+                # Built once, in the order the stocks were selected
+                order = {stock: i for i, stock in enumerate(selected_stocks)}
+                results.sort(key=lambda row: order[row['Stock']])
+                analysis_df = pd.DataFrame(results, columns=['Stock', 'Trade Recommendation'])
+                charts_path = exporter.close()
+                for stock, error in exporter.errors:
+                    st.warning(f"Chart export failed for {stock}: {error}")
+
+                # Remove the export file left over from the previous run
+                previous_path = st.session_state.get("charts_path")
+                if previous_path and previous_path != charts_path and os.path.exists(previous_path):
+                    os.remove(previous_path)
+                st.session_state["charts_path"] = charts_path
             
-            st.subheader("Analysis Results")
-            st.table(analysis_df)
-
-            col1, col2 = st.columns(2)
-            with col1:
-                excel_buffer = io.BytesIO()
-                with pd.ExcelWriter(excel_buffer, engine='xlsxwriter') as writer:
-                    analysis_df.to_excel(writer, index=False, sheet_name='Trade_Recommendations')
-                excel_buffer.seek(0)
+                st.subheader("Analysis Results")
+                st.table(analysis_df)
+
+                col1, col2 = st.columns(2)
+                with col1:
+                    excel_buffer = io.BytesIO()
+                    with pd.ExcelWriter(excel_buffer, engine='xlsxwriter') as writer:
+                        analysis_df.to_excel(writer, index=False, sheet_name='Trade_Recommendations')
+                    excel_buffer.seek(0)
                 
-                st.download_button(
-                    label="Download Analysis Excel",
-                    data=excel_buffer,
-                    file_name='stock_analysis.xlsx',
-                    mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-                )
-            
-            with col2:
-                if chart_images:
                     st.download_button(
-                        label="Download All Charts (PDF)",
-                        data=pdf_buffer,
-                        file_name="all_stock_charts.pdf",
-                        mime="application/pdf"
-                    )
\ No newline at end of file
+                        label="Download Analysis Excel",
+                        data=excel_buffer,
+                        file_name='stock_analysis.xlsx',
+                        mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+                    )
+            
+                with col2:
+                    if charts_path:
+                        is_pdf = export_format == "png"
+                        with open(charts_path, "rb") as charts_file:
+                            st.download_button(
+                                label="Download All Charts (PDF)" if is_pdf else f"Download All Charts ({export_format.upper()} ZIP)",
+                                data=charts_file,
+                                file_name="all_stock_charts.pdf" if is_pdf else f"all_stock_charts_{export_format}.zip",
+                                mime="application/pdf" if is_pdf else "application/zip"
+                            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+"""Hot paths ka reproducible benchmark, synthetic OHLCV data par (network ki zaroorat nahi).
+
+Usage:
+    python benchmark.py --symbols 216 --bars 6000 --output benchmark_results.json
+    python benchmark.py --baseline benchmark_baseline.json   # regression par exit code 1
+    python benchmark.py --save-baseline benchmark_baseline.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from market_data import FakeProvider, slice_period
+
+BENCH_END = pd.Timestamp("2025-12-31 15:29", tz="Asia/Kolkata")
+BARS_PER_SESSION = 25  # 15m bars, 09:15-15:30
+
+# ================= Synthetic data =================
+def synthetic_frames(n_symbols, n_bars, interval="15m"):
+    """N symbols x M bars ke deterministic OHLCV frames (FakeProvider ke generator se)."""
+    days = n_bars if interval == "1d" else math.ceil(n_bars / BARS_PER_SESSION)
+    start = (BENCH_END.normalize() - pd.offsets.BDay(days + 2)).tz_localize(None)
+    provider = FakeProvider(start=start, clock=lambda: BENCH_END)
+    return {f"SYN{i:03d}.NS": provider.history(f"SYN{i:03d}.NS", interval, period="max").iloc[-n_bars:]
+            for i in range(n_symbols)}
+
+class StaticProvider:
+    """Pehle se bane frames memory se serve karta hai. `cursor` = kitne bars dikhne chahiye (None = sab)."""
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.cursor = None
+
+    def history(self, symbol, interval, period=None, start=None):
+        bars = self.frames[symbol]
+        if self.cursor is not None:
+            bars = bars.iloc[:self.cursor]
+        if start is not None:
+            return bars[bars.index >= pd.Timestamp(start)]
+        return slice_period(bars, period) if period else bars
+
+def option_symbol_table(rows):
+    """auto_analysis.load_data ke liye option-symbol sheet jaisa bada table (25 columns)."""
+    months = ["JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"]
+    names = [f"STOCK{i}" for i in range(rows)]
+    expiry = [f"25{months[i % 12]}" for i in range(rows)]
+    table = {f"col {c}": np.arange(rows) * c for c in range(23)}
+    table["option symbol ce "] = [f"{n}{e}{100 + i}CE" for i, (n, e) in enumerate(zip(names, expiry))]
+    table["option symbol pe"] = [f"{n}{e}{100 + i}PE" for i, (n, e) in enumerate(zip(names, expiry))]
+    return pd.DataFrame(table)
+
+# ================= Measurement =================
+def measure(fn, repeat):
+    """fn ko `repeat` baar chala kar sabse kam time, phir ek tracemalloc run se peak memory (MB)."""
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(times), peak / 2 ** 20, result
+
+@contextlib.contextmanager
+def quiet():
+    """Scripts ke print() ko benchmark output se bahar rakhein."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+# ================= Workloads =================
+def bench_backtest(frames, repeat, workers):
+    import RSI_VWAP_VOL_msg_2 as strategy
+    strategy.DATA_PROVIDER = StaticProvider(frames)
+    strategy.send_telegram = lambda message: None
+    bars = sum(len(f) for f in frames.values())
+
+    def run():
+        with quiet():
+            return strategy.run_backtest(list(frames), "max", workers=workers)
+
+    seconds, peak, _ = measure(run, repeat)
+    return {"seconds": seconds, "throughput": bars / seconds, "unit": "bars/sec", "peak_mb": peak}
+
+def bench_live_cycle(frames, repeat):
+    import RSI_VWAP_VOL_msg_2 as strategy
+    from trade_journal import TradeJournal
+    strategy.send_telegram = lambda message: None
+    # Rate limit network ke liye hai; memory provider par woh sirf sleep naapta
+    strategy.FETCH_RATE_PER_SEC = None
+    provider = StaticProvider(frames)
+    tickers = list(frames)
+    journal = TradeJournal("bench_journal.db", csv_mirror="bench_trade_log.csv")
+    n_bars = min(len(f) for f in frames.values())
+    provider.cursor = n_bars - repeat - 2
+
+    # Pehla (cold) cycle indicator state banata hai; timing har agle bar wale warm cycle ki hai
+    with quiet():
+        strategy.INDICATOR_STATES.clear()
+        start = time.perf_counter()
+        strategy.run_cycle(tickers, journal, provider)
+        cold = time.perf_counter() - start
+
+    def run():
+        provider.cursor += 1
+        with quiet():
+            strategy.run_cycle(tickers, journal, provider)
+
+    seconds, peak, _ = measure(run, repeat)
+    journal.close()
+    return {"seconds": seconds, "cold_seconds": cold, "throughput": len(tickers) / seconds,
+            "unit": "symbols/sec", "peak_mb": peak}
+
+def bench_kernels(frames, repeat):
+    import RSI_VWAP_VOL_msg_2 as strategy
+    from indicators import build_panel, panel_rolling_mean, panel_rsi_sma, panel_vwap
+    _, _, panel = build_panel(frames)
+    bars = panel["Close"].size
+
+    def run_panel():
+        panel_vwap(panel["High"], panel["Low"], panel["Close"], panel["Volume"])
+        panel_rsi_sma(panel["Close"])
+        panel_rolling_mean(panel["Volume"], 20, 1)
+
+    def run_per_symbol():
+        for df in frames.values():
+            strategy.vwap(df)
+            strategy.rsi(df["Close"])
+
+    seconds, peak, _ = measure(run_panel, repeat)
+    per_symbol, per_symbol_peak, _ = measure(run_per_symbol, repeat)
+    return {
+        "panel": {"seconds": seconds, "throughput": bars / seconds, "unit": "bars/sec", "peak_mb": peak},
+        "per_symbol": {"seconds": per_symbol, "throughput": bars / per_symbol, "unit": "bars/sec",
+                       "peak_mb": per_symbol_peak},
+    }
+
+def bench_load_data(rows, repeat):
+    try:
+        import auto_analysis
+    except ImportError as e:
+        return {"skipped": f"auto_analysis import nahi hua: {e}"}
+    table = option_symbol_table(rows)
+    table.to_csv("options.csv", index=False)
+    table.to_excel("options.xlsx", index=False)
+    shutil.copy("options.xlsx", "options.xlsm")
+
+    results = {}
+    for name in ("options.csv", "options.xlsx", "options.xlsm"):
+        def run(name=name):
+            # Har run ek naya upload hai; content-hash cache ko khaali rakhein
+            auto_analysis.parse_option_file.clear()
+            with open(name, "rb") as f:
+                return auto_analysis.load_data(f)
+        seconds, peak, _ = measure(run, repeat)
+        results[name.split(".")[1]] = {"seconds": seconds, "throughput": rows / seconds, "unit": "rows/sec",
+                                       "peak_mb": peak}
+    return results
+
+def bench_charts(frames, repeat):
+    try:
+        import auto_analysis
+    except ImportError as e:
+        return {"skipped": f"auto_analysis import nahi hua: {e}"}
+    symbols = list(frames)
+
+    def build():
+        return [auto_analysis.create_full_chart(s, frames[s], frames[s]["Close"].iloc[-1], "Neutral")
+                for s in symbols]
+
+    seconds, peak, figures = measure(build, repeat)
+    results = {"build": {"seconds": seconds, "throughput": len(symbols) / seconds, "unit": "charts/sec",
+                         "peak_mb": peak}}
+    try:
+        import kaleido  # noqa: F401
+    except ImportError:
+        results["export"] = {"skipped": "kaleido installed nahi hai"}
+        return results
+
+    def export():
+        for fig in figures:
+            fig.to_image(format="png")
+
+    seconds, peak, _ = measure(export, 1)
+    results["export"] = {"seconds": seconds, "throughput": len(figures) / seconds, "unit": "charts/sec",
+                         "peak_mb": peak}
+    return results
+
+WORKLOADS = ("backtest", "live_cycle", "kernels", "load_data", "charts")
+
+def run_benchmarks(args):
+    results = {}
+    frames_15m = synthetic_frames(args.symbols, args.bars, "15m")
+    frames_1d = synthetic_frames(min(args.symbols, args.charts), 63, "1d")
+    only = set(args.only.split(",")) if args.only else set(WORKLOADS)
+    if "backtest" in only:
+        results["backtest"] = bench_backtest(frames_15m, args.repeat, args.workers)
+    if "live_cycle" in only:
+        results["live_cycle"] = bench_live_cycle(frames_15m, args.repeat)
+    if "kernels" in only:
+        results.update(_flatten("kernels", bench_kernels(frames_15m, args.repeat)))
+    if "load_data" in only:
+        results.update(_flatten("load_data", bench_load_data(args.rows, args.repeat)))
+    if "charts" in only:
+        results.update(_flatten("charts", bench_charts(frames_1d, args.repeat)))
+    return results
+
+def _flatten(prefix, results):
+    """{"csv": {...}} ko {"load_data.csv": {...}} banayein; skip hua workload waise hi rehta hai."""
+    if "skipped" in results:
+        return {prefix: results}
+    return {f"{prefix}.{name}": value for name, value in results.items()}
+
+# ================= Baseline comparison =================
+def compare(results, baseline, tolerance, memory_tolerance):
+    """Baseline se dheema (ya zyada memory wala) har workload ek regression line deta hai."""
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base or "seconds" not in current or "seconds" not in base:
+            continue
+        ratio = current["seconds"] / base["seconds"]
+        print(f"{name:24s} {current['seconds']:10.4f}s  baseline {base['seconds']:10.4f}s  x{ratio:5.2f}")
+        if ratio > 1 + tolerance:
+            regressions.append(f"{name}: {ratio:.2f}x slower than baseline")
+        if base.get("peak_mb") and current["peak_mb"] > base["peak_mb"] * (1 + memory_tolerance):
+            regressions.append(f"{name}: peak memory {current['peak_mb']:.1f} MB vs {base['peak_mb']:.1f} MB")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the backtest, live-cycle, indicator, loader and chart hot paths.")
+    parser.add_argument("--symbols", type=int, default=50, help="synthetic symbols (N)")
+    parser.add_argument("--bars", type=int, default=2000, help="15m bars per symbol (M)")
+    parser.add_argument("--rows", type=int, default=5000, help="rows in the synthetic option-symbol files")
+    parser.add_argument("--charts", type=int, default=20, help="charts to build/export")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per workload (minimum is reported)")
+    parser.add_argument("--workers", type=int, default=1, help="backtest process-pool workers")
+    parser.add_argument("--only", help=f"comma-separated subset of {','.join(WORKLOADS)}")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="compare against this results JSON and fail on regressions")
+    parser.add_argument("--save-baseline", help="also write the results to this path as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown fraction")
+    parser.add_argument("--memory-tolerance", type=float, default=0.25, help="allowed peak-memory growth fraction")
+    args = parser.parse_args(argv)
+
+    # Scripts cwd mein files likhte hain (trade log, checkpoints), isliye temp dir mein chalayein
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, repo_dir)
+    output = os.path.abspath(args.output)
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+    save_baseline = os.path.abspath(args.save_baseline) if args.save_baseline else None
+    work_dir = tempfile.mkdtemp(prefix="bench_")
+    cwd = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        results = run_benchmarks(args)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "meta": {"symbols": args.symbols, "bars": args.bars, "rows": args.rows, "repeat": args.repeat,
+                 "workers": args.workers, "python": platform.python_version(), "numpy": np.__version__,
+                 "pandas": pd.__version__, "machine": platform.machine()},
+        "results": results,
+    }
+    for path in filter(None, (output, save_baseline)):
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(results, indent=2))
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance, args.memory_tolerance)
+        if regressions:
+            print("\nREGRESSION:\n  " + "\n  ".join(regressions))
+            return 1
+        print("\nKoi regression nahi.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
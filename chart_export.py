@@ -0,0 +1,153 @@
+import io
+import multiprocessing
+import os
+import tempfile
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, PdfParser
+
+EXPORT_WORKERS = max(1, min(4, os.cpu_count() or 1))
+
+# Output formats: "png" rasterizes every chart into one multi-page PDF,
+# "svg" / "pdf" keep the charts as vector files inside a ZIP archive.
+EXPORT_FORMATS = {"png": ".pdf", "svg": ".zip", "pdf": ".zip"}
+
+def _render(fig_json, image_format, scale):
+    # Runs in a worker process, each with its own Kaleido instance
+    import plotly.io as pio
+    return pio.from_json(fig_json).to_image(format=image_format, scale=scale)
+
+class PdfPageWriter:
+    """Writes images as pages of a PDF that stays open, so each page costs the same to add.
+
+    Pages go straight to the file as JPEG image objects; the page tree, catalog and xref
+    table are written once in `close()`. Appending with PIL's `save(append=True)` instead
+    re-parses the whole file for every page.
+    """
+
+    def __init__(self, path, resolution=100.0):
+        self.resolution = resolution
+        self.pdf = PdfParser.PdfParser(filename=path, mode="w+b")
+        self.pdf.start_writing()
+        self.pdf.write_header()
+        self.pdf.write_comment("created by chart_export")
+        # Reserve the page tree object now; it is written in close() once all Kids are known
+        self.pdf.pages_ref = self.pdf.next_object_id(0)
+
+    def add_page(self, img):
+        img = img.convert("RGB")
+        jpeg = io.BytesIO()
+        img.save(jpeg, "JPEG")
+        width = img.width * 72.0 / self.resolution
+        height = img.height * 72.0 / self.resolution
+        image_ref = self.pdf.write_obj(
+            None,
+            stream=jpeg.getvalue(),
+            Type=PdfParser.PdfName("XObject"),
+            Subtype=PdfParser.PdfName("Image"),
+            Width=img.width,
+            Height=img.height,
+            Filter=PdfParser.PdfName("DCTDecode"),
+            BitsPerComponent=8,
+            ColorSpace=PdfParser.PdfName("DeviceRGB"),
+        )
+        contents_ref = self.pdf.write_obj(None, stream=b"q %f 0 0 %f 0 0 cm /image Do Q\n" % (width, height))
+        page_ref = self.pdf.write_page(
+            None,
+            Resources=PdfParser.PdfDict(
+                ProcSet=[PdfParser.PdfName("PDF"), PdfParser.PdfName("ImageC")],
+                XObject=PdfParser.PdfDict(image=image_ref),
+            ),
+            MediaBox=[0, 0, width, height],
+            Contents=contents_ref,
+        )
+        self.pdf.pages.append(page_ref)
+
+    def close(self):
+        """Write the page tree, catalog and xref table and close the file."""
+        pdf = self.pdf
+        pdf.root_ref = pdf.write_obj(None, Type=PdfParser.PdfName("Catalog"), Pages=pdf.pages_ref)
+        pdf.write_obj(pdf.pages_ref, Type=PdfParser.PdfName("Pages"), Count=len(pdf.pages), Kids=pdf.pages)
+        pdf.write_xref_and_trailer()
+        pdf.close()
+
+    def abort(self):
+        """Close the file without finishing it."""
+        self.pdf.close()
+
+class ChartExporter:
+    """Exports plotly figures in a process pool and writes them to a temporary file as they finish.
+
+    Pages are written in submission order. At most `max_in_flight` rendered charts are waiting
+    in memory at any time, so memory use stays flat no matter how many charts are exported.
+    Workers are spawned rather than forked by default: the exporter is used while other threads
+    (downloads, Parquet reads) may hold locks that a forked child would inherit.
+    """
+
+    def __init__(self, image_format="png", workers=EXPORT_WORKERS, max_in_flight=None, scale=1,
+                 mp_context=None):
+        if image_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {image_format}")
+        self.image_format = image_format
+        self.scale = scale
+        self.max_in_flight = max_in_flight or workers * 2
+        fd, self.path = tempfile.mkstemp(prefix="charts_", suffix=EXPORT_FORMATS[image_format])
+        os.close(fd)
+        self.archive = zipfile.ZipFile(self.path, "w", zipfile.ZIP_DEFLATED) if image_format != "png" else None
+        self.pdf = PdfPageWriter(self.path) if image_format == "png" else None
+        self.executor = ProcessPoolExecutor(max_workers=workers,
+                                            mp_context=mp_context or multiprocessing.get_context("spawn"))
+        self.in_flight = deque()
+        self.pages = 0
+        self.errors = []
+
+    def submit(self, name, fig):
+        """Queue a figure for export; blocks only when too many rendered charts are waiting."""
+        future = self.executor.submit(_render, fig.to_json(), self.image_format, self.scale)
+        self.in_flight.append((name, future))
+        while len(self.in_flight) > self.max_in_flight:
+            self._write_next()
+
+    def _write_next(self):
+        name, future = self.in_flight.popleft()
+        try:
+            data = future.result()
+        except Exception as e:
+            self.errors.append((name, str(e)))
+            return
+        if self.archive is not None:
+            self.archive.writestr(f"{name}.{self.image_format}", data)
+        else:
+            # Append one page at a time instead of holding every image until the end
+            with Image.open(io.BytesIO(data)) as img:
+                self.pdf.add_page(img)
+        self.pages += 1
+
+    def close(self):
+        """Finish pending exports and return the output path (None if nothing was exported)."""
+        try:
+            while self.in_flight:
+                self._write_next()
+        finally:
+            self.executor.shutdown(cancel_futures=True)
+            if self.archive is not None:
+                self.archive.close()
+            if self.pdf is not None:
+                self.pdf.close()
+        if not self.pages:
+            os.remove(self.path)
+            return None
+        return self.path
+
+    def cancel(self):
+        """Drop pending exports and delete the partial output file."""
+        self.in_flight.clear()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if self.archive is not None:
+            self.archive.close()
+        if self.pdf is not None:
+            self.pdf.abort()
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,182 @@
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging.handlers import RotatingFileHandler
+
+import numpy as np
+
+# Live loop ke stages, JSONL aur Prometheus output mein isi order mein
+STAGES = ("fetch", "indicators", "signal", "log_append", "notify")
+
+class CycleRecord:
+    """Ek monitoring cycle ki timings: har stage ka total aur har ticker ka har stage.
+
+    `stage()` context manager ya `add()` se time jodte hain; fetch worker threads se bhi
+    `add()` safe hai.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self._t0 = time.perf_counter()
+        self.total = None
+        self.stages = defaultdict(float)
+        self.tickers = defaultdict(lambda: defaultdict(float))
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds, ticker=None):
+        with self._lock:
+            self.stages[stage] += seconds
+            if ticker is not None:
+                self.tickers[ticker][stage] += seconds
+
+    @contextmanager
+    def stage(self, stage, ticker=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start, ticker)
+
+    def finish(self):
+        self.total = time.perf_counter() - self._t0
+        return self.total
+
+    def ticker_totals(self):
+        return {ticker: sum(stages.values()) for ticker, stages in self.tickers.items()}
+
+class CycleMetrics:
+    """Cycles ki history rakhta hai, overrun flag karta hai, aur JSONL / Prometheus text mein export karta hai.
+
+    Cycle total `overrun_fraction * interval_seconds` se zyada ho to overrun maana jaata hai.
+    JSONL file RotatingFileHandler se rotate hoti hai (`max_bytes`, `backups`).
+    """
+
+    def __init__(self, interval_seconds, overrun_fraction=0.5, jsonl_path=None, max_bytes=5 * 2 ** 20,
+                 backups=3, history=200):
+        self.interval_seconds = interval_seconds
+        self.overrun_fraction = overrun_fraction
+        self.history = deque(maxlen=history)
+        self.cycles = 0
+        self.overruns = 0
+        self.total_seconds = 0.0
+        self.stage_seconds = defaultdict(float)
+        self._lock = threading.Lock()
+        self._logger = None
+        if jsonl_path:
+            self._logger = logging.getLogger(f"cycle_metrics.{jsonl_path}")
+            self._logger.setLevel(logging.INFO)
+            self._logger.propagate = False
+            if not self._logger.handlers:
+                handler = RotatingFileHandler(jsonl_path, maxBytes=max_bytes, backupCount=backups)
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                self._logger.addHandler(handler)
+
+    def record(self, cycle):
+        """Poori hui cycle jodein; overrun ho to True return karta hai."""
+        total = cycle.total if cycle.total is not None else cycle.finish()
+        overrun = total > self.overrun_fraction * self.interval_seconds
+        ticker_totals = cycle.ticker_totals()
+        with self._lock:
+            self.cycles += 1
+            self.overruns += int(overrun)
+            self.total_seconds += total
+            for stage, seconds in cycle.stages.items():
+                self.stage_seconds[stage] += seconds
+            self.history.append((total, ticker_totals))
+        if self._logger is not None:
+            self._logger.info(json.dumps({
+                "time": cycle.started,
+                "total": round(total, 4),
+                "overrun": overrun,
+                "errors": cycle.errors,
+                "stages": {stage: round(cycle.stages.get(stage, 0.0), 4) for stage in STAGES},
+                "tickers": {t: {s: round(v, 4) for s, v in stages.items()} for t, stages in cycle.tickers.items()},
+            }))
+        if overrun:
+            print(f"Cycle overrun: {total:.1f}s (limit {self.overrun_fraction * self.interval_seconds:.0f}s)")
+        return overrun
+
+    def latency_percentiles(self):
+        with self._lock:
+            totals = [total for total, _ in self.history]
+        if not totals:
+            return None, None
+        return float(np.percentile(totals, 50)), float(np.percentile(totals, 95))
+
+    def slowest_symbols(self, count=5):
+        """Recent cycles mein average time ke hisaab se sabse slow symbols [(symbol, seconds)]."""
+        sums = defaultdict(float)
+        counts = defaultdict(int)
+        with self._lock:
+            for _, ticker_totals in self.history:
+                for ticker, seconds in ticker_totals.items():
+                    sums[ticker] += seconds
+                    counts[ticker] += 1
+        averages = {ticker: sums[ticker] / counts[ticker] for ticker in sums}
+        return sorted(averages.items(), key=lambda item: item[1], reverse=True)[:count]
+
+    def status_text(self):
+        """Hourly status message ke liye p50/p95 aur slowest symbols."""
+        p50, p95 = self.latency_percentiles()
+        if p50 is None:
+            return "Abhi tak koi cycle poori nahi hui."
+        slowest = ", ".join(f"{ticker} ({seconds:.1f}s)" for ticker, seconds in self.slowest_symbols())
+        return (f"Cycle latency p50: {p50:.1f}s, p95: {p95:.1f}s\n"
+                f"Cycles: {self.cycles}, overruns: {self.overruns}\n"
+                f"Slowest: {slowest}")
+
+    def prometheus_text(self):
+        p50, p95 = self.latency_percentiles()
+        with self._lock:
+            last_total, last_tickers = self.history[-1] if self.history else (0.0, {})
+            lines = [
+                "# HELP monitor_cycle_seconds Live monitoring cycle duration.",
+                "# TYPE monitor_cycle_seconds summary",
+                f'monitor_cycle_seconds{{quantile="0.5"}} {p50 if p50 is not None else "NaN"}',
+                f'monitor_cycle_seconds{{quantile="0.95"}} {p95 if p95 is not None else "NaN"}',
+                f"monitor_cycle_seconds_sum {self.total_seconds}",
+                f"monitor_cycle_seconds_count {self.cycles}",
+                "# HELP monitor_last_cycle_seconds Duration of the most recent cycle.",
+                "# TYPE monitor_last_cycle_seconds gauge",
+                f"monitor_last_cycle_seconds {last_total}",
+                "# HELP monitor_cycle_overruns_total Cycles longer than the overrun limit.",
+                "# TYPE monitor_cycle_overruns_total counter",
+                f"monitor_cycle_overruns_total {self.overruns}",
+                "# HELP monitor_stage_seconds_total Time spent per stage across all cycles, summed over symbols (fetches overlap).",
+                "# TYPE monitor_stage_seconds_total counter",
+            ]
+            lines += [f'monitor_stage_seconds_total{{stage="{stage}"}} {self.stage_seconds.get(stage, 0.0)}'
+                      for stage in STAGES]
+            lines += ["# HELP monitor_symbol_seconds Per-symbol time in the most recent cycle.",
+                      "# TYPE monitor_symbol_seconds gauge"]
+            lines += [f'monitor_symbol_seconds{{symbol="{ticker}"}} {seconds}'
+                      for ticker, seconds in sorted(last_tickers.items())]
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="127.0.0.1"):
+        """Background thread mein /metrics endpoint (Prometheus text format) chalayein."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip("/") not in ("", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
@@ -0,0 +1,378 @@
+import math
+import os
+import pickle
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+# ================= Streaming indicators =================
+# Har class ek naye bar par constant time mein update hoti hai aur pandas wale version
+# (RSI_VWAP_VOL_msg_2.vwap/rsi, rolling mean, auto_analysis ke SMA/EMA/RSI) se match karti hai.
+# `update(x)` state mein bar jodta hai; `peek(x)` wahi value deta hai bina state badle,
+# jo abhi ban rahe (forming) bar ke liye kaam aata hai.
+
+def _rsi_value(up, down):
+    """pandas ki tarah: down 0 ho to RSI 100, dono 0 (ya NaN) hon to NaN."""
+    if math.isnan(up) or math.isnan(down):
+        return math.nan
+    if down == 0:
+        return math.nan if up == 0 else 100.0
+    return 100 - (100 / (1 + up / down))
+
+class RollingMean:
+    """`Series.rolling(window, min_periods=...).mean()` ka streaming version (NaN values skip hote hain)."""
+
+    def __init__(self, window, min_periods=None):
+        self.window = window
+        self.min_periods = window if min_periods is None else min_periods
+        self.values = deque(maxlen=window)
+        self.total = 0.0
+        self.count = 0
+        self._updates = 0
+
+    def _result(self, total, count):
+        return total / count if count >= self.min_periods and count else math.nan
+
+    def _after_push(self, x):
+        """Naya value jodne ke baad (total, count), state badle bina."""
+        total, count = self.total, self.count
+        if len(self.values) == self.window:
+            old = self.values[0]
+            if not math.isnan(old):
+                total -= old
+                count -= 1
+        if not math.isnan(x):
+            total += x
+            count += 1
+        return total, count
+
+    def peek(self, x):
+        return self._result(*self._after_push(x))
+
+    def update(self, x):
+        self.total, self.count = self._after_push(x)
+        self.values.append(x)
+        self._updates += 1
+        # Running sum mein float error jama na ho, isliye har window ke baad exact sum dobara
+        if self._updates % self.window == 0:
+            self.total = math.fsum(v for v in self.values if not math.isnan(v))
+        return self._result(self.total, self.count)
+
+class EMA:
+    """`Series.ewm(span=... / alpha=..., adjust=False).mean()` ka streaming version."""
+
+    def __init__(self, span=None, alpha=None):
+        self.alpha = alpha if alpha is not None else 2 / (span + 1)
+        self.value = math.nan
+
+    def peek(self, x):
+        if math.isnan(x):
+            return self.value
+        if math.isnan(self.value):
+            return x
+        return (1 - self.alpha) * self.value + self.alpha * x
+
+    def update(self, x):
+        self.value = self.peek(x)
+        return self.value
+
+class SimpleRSI:
+    """RSI_VWAP_VOL_msg_2.rsi jaisa RSI: gains/losses ka simple rolling mean (min_periods=1)."""
+
+    def __init__(self, period=14):
+        self.prev_close = math.nan
+        self.up = RollingMean(period, min_periods=1)
+        self.down = RollingMean(period, min_periods=1)
+
+    def _split(self, close):
+        delta = close - self.prev_close
+        if math.isnan(delta):
+            return math.nan, math.nan
+        return max(delta, 0.0), max(-delta, 0.0)
+
+    def peek(self, close):
+        up, down = self._split(close)
+        return _rsi_value(self.up.peek(up), self.down.peek(down))
+
+    def update(self, close):
+        up, down = self._split(close)
+        self.prev_close = close
+        return _rsi_value(self.up.update(up), self.down.update(down))
+
+class WilderRSI:
+    """auto_analysis jaisa RSI: gains/losses par `ewm(alpha=1/period, adjust=False)`."""
+
+    def __init__(self, period=14):
+        self.prev_close = math.nan
+        self.gain = EMA(alpha=1 / period)
+        self.loss = EMA(alpha=1 / period)
+
+    def _split(self, close):
+        delta = close - self.prev_close
+        # pandas `delta.where(delta > 0, 0)` pehle (NaN) delta ko 0 bana deta hai
+        if math.isnan(delta):
+            return 0.0, 0.0
+        return max(delta, 0.0), max(-delta, 0.0)
+
+    def peek(self, close):
+        gain, loss = self._split(close)
+        return _rsi_value(self.gain.peek(gain), self.loss.peek(loss))
+
+    def update(self, close):
+        gain, loss = self._split(close)
+        self.prev_close = close
+        return _rsi_value(self.gain.update(gain), self.loss.update(loss))
+
+class SessionVWAP:
+    """Aakhri `sessions` trading dates par cumulative VWAP.
+
+    Live loop `period="2d"` ke bars par vwap() chalata hai, yaani aakhri bar par VWAP = pichhle
+    session + aaj ke saare bars. Yeh class wahi value har session ke (price*volume, volume) totals
+    rakh kar deti hai.
+    """
+
+    def __init__(self, sessions=2):
+        self.sessions = sessions
+        self.completed = deque(maxlen=sessions - 1)  # (pv, v) pichhle poore sessions ke
+        self.session = None
+        self.pv = 0.0
+        self.v = 0.0
+
+    def _after_push(self, session, price, volume):
+        completed = list(self.completed)
+        pv, v = self.pv, self.v
+        if self.session is not None and session != self.session:
+            completed.append((pv, v))
+            completed = completed[-(self.sessions - 1):] if self.sessions > 1 else []
+            pv, v = 0.0, 0.0
+        return completed, pv + price * volume, v + volume
+
+    @staticmethod
+    def _value(completed, pv, v):
+        total_pv = pv + sum(c[0] for c in completed)
+        total_v = v + sum(c[1] for c in completed)
+        return total_pv / total_v if total_v else math.nan
+
+    def peek(self, session, high, low, close, volume):
+        return self._value(*self._after_push(session, (high + low + close) / 3, volume))
+
+    def update(self, session, high, low, close, volume):
+        completed, self.pv, self.v = self._after_push(session, (high + low + close) / 3, volume)
+        self.completed = deque(completed, maxlen=self.sessions - 1)
+        self.session = session
+        return self._value(completed, self.pv, self.v)
+
+class SymbolIndicators:
+    """Live loop ke liye ek symbol ki poori indicator state: VWAP, RSI aur 20-bar VolumeAvg."""
+
+    def __init__(self, rsi_period=14, volume_window=20, vwap_sessions=2):
+        self.vwap = SessionVWAP(vwap_sessions)
+        self.rsi = SimpleRSI(rsi_period)
+        self.volume_avg = RollingMean(volume_window, min_periods=1)
+        self.last_time = None
+        self.last_evaluated = None # Aakhri bar jis par signal check hua (peek), taaki woh dobara check na ho
+
+    def update(self, time, high, low, close, volume):
+        values = {
+            "VWAP": self.vwap.update(time.date(), high, low, close, volume),
+            "RSI": self.rsi.update(close),
+            "VolumeAvg": self.volume_avg.update(volume),
+        }
+        self.last_time = time
+        return values
+
+    def peek(self, time, high, low, close, volume):
+        return {
+            "VWAP": self.vwap.peek(time.date(), high, low, close, volume),
+            "RSI": self.rsi.peek(close),
+            "VolumeAvg": self.volume_avg.peek(volume),
+        }
+
+    def update_frame(self, bars):
+        """Sirf `last_time` ke baad wale bars state mein jodein (Datetime index wala OHLCV frame)."""
+        if self.last_time is not None:
+            bars = bars[bars.index > self.last_time]
+        for row in bars.itertuples():
+            self.update(row.Index, row.High, row.Low, row.Close, row.Volume)
+        return len(bars)
+
+# ================= Panel kernels =================
+# Yeh functions (symbols, bars) shape ke aligned 2-D arrays par ek hi vectorized pass mein
+# poore universe ke indicators nikaalte hain. 1-D array bhi chalta hai (ek symbol).
+# NaN ka matlab missing bar: output bhi wahan NaN hota hai aur rolling/cumulative state us bar
+# ko skip karti hai. Rolling windows bar slots mein ginti hain (missing bar bhi ek slot hai).
+
+def build_panel(frames, columns=("Open", "High", "Low", "Close", "Volume")):
+    """{symbol: OHLCV DataFrame} ko common time index par align karein.
+
+    Returns (symbols, index, {column: 2-D array}); jis symbol ka bar kisi time par nahi hai wahan NaN.
+    """
+    symbols = list(frames)
+    index = pd.DatetimeIndex([])
+    for df in frames.values():
+        index = index.union(df.index)
+    panel = {col: np.full((len(symbols), len(index)), np.nan) for col in columns}
+    for row, symbol in enumerate(symbols):
+        df = frames[symbol]
+        pos = index.get_indexer(df.index)
+        for col in columns:
+            panel[col][row, pos] = df[col].to_numpy(dtype=float)
+    return symbols, index, panel
+
+def stack_frames(frames, columns=("Open", "High", "Low", "Close", "Volume"), dropna=False):
+    """{symbol: OHLCV DataFrame} ko har symbol ke apne bars ke order mein (right-aligned) 2-D arrays banayein.
+
+    Chhoti history wale symbols aage NaN se pad hote hain, isliye har row par kernel ka result wahi hai
+    jo us symbol ke akele frame par aata, aur aakhri column har symbol ka aakhri bar hai (screening ke
+    liye). `dropna=True` par kisi bhi column mein NaN wale bars pehle hi hata diye jaate hain
+    (`df.dropna()` jaisa, par har frame par pandas call ke bina).
+    Returns (symbols, lengths, {column: 2-D array}); `unstack_row` se row wapas frame ki length par.
+    """
+    symbols = list(frames)
+    blocks = []
+    for symbol in symbols:
+        df = frames[symbol]
+        values = np.column_stack([df[col].to_numpy(dtype=float) for col in columns])
+        if dropna:
+            values = values[~np.isnan(values).any(axis=1)]
+        blocks.append(values)
+    lengths = np.array([len(values) for values in blocks], dtype=np.int64)
+    width = int(lengths.max()) if len(lengths) else 0
+    stacked = np.full((len(symbols), width, len(columns)), np.nan)
+    for row, values in enumerate(blocks):
+        if len(values):
+            stacked[row, width - len(values):] = values
+    return symbols, lengths, {col: stacked[:, :, i] for i, col in enumerate(columns)}
+
+def unstack_row(values, length):
+    """`stack_frames` wale panel ki ek row se padding hata kar symbol ke apne bars wala hissa."""
+    return values[len(values) - length:]
+
+def _as_2d(x):
+    x = np.asarray(x, dtype=float)
+    return (x[None, :], True) if x.ndim == 1 else (x, False)
+
+def _restore(x, squeeze):
+    return x[0] if squeeze else x
+
+def panel_vwap(high, low, close, volume):
+    """Cumulative VWAP (RSI_VWAP_VOL_msg_2.vwap jaisa) har row par."""
+    high, squeeze = _as_2d(high)
+    low, close, volume = (_as_2d(x)[0] for x in (low, close, volume))
+    pv = (high + low + close) / 3 * volume
+    missing = np.isnan(pv)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        result = np.cumsum(np.where(missing, 0.0, pv), axis=-1) / np.cumsum(np.where(missing, 0.0, volume), axis=-1)
+    result[missing] = np.nan
+    return _restore(result, squeeze)
+
+def session_vwap(high, low, close, volume, session, sessions=2):
+    """SessionVWAP jaisa VWAP (aakhri `sessions` trading dates par cumulative), ek symbol ke 1-D arrays par.
+
+    `session` har bar ki trading date (ya koi bhi sorted session key) hai.
+    """
+    pv = (np.asarray(high, dtype=float) + np.asarray(low, dtype=float) + np.asarray(close, dtype=float)) / 3
+    volume = np.asarray(volume, dtype=float)
+    pv = pv * volume
+    if not len(pv):
+        return pv
+    session = np.asarray(session)
+    is_start = np.concatenate([[True], session[1:] != session[:-1]])
+    starts = np.flatnonzero(is_start)
+    session_no = np.cumsum(is_start) - 1
+    # Session ke andar cumulative totals
+    cum_pv, cum_v = np.cumsum(pv), np.cumsum(volume)
+    base_pv = np.concatenate([[0.0], cum_pv[starts[1:] - 1]])
+    base_v = np.concatenate([[0.0], cum_v[starts[1:] - 1]])
+    # Pichhle (sessions - 1) poore sessions ke totals: session starts par cumulative ka farq
+    lag = np.maximum(np.arange(len(starts)) - (sessions - 1), 0)
+    prev_pv = base_pv - base_pv[lag]
+    prev_v = base_v - base_v[lag]
+    total_pv = cum_pv - base_pv[session_no] + prev_pv[session_no]
+    total_v = cum_v - base_v[session_no] + prev_v[session_no]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(total_v != 0, total_pv / total_v, np.nan)
+
+def panel_rolling_mean(x, window, min_periods=None):
+    """`rolling(window, min_periods).mean()` har row par; NaN values skip hote hain."""
+    x, squeeze = _as_2d(x)
+    min_periods = window if min_periods is None else min_periods
+    valid = ~np.isnan(x)
+    padded = np.concatenate([np.zeros(x.shape[:-1] + (window - 1,)), np.where(valid, x, 0.0)], axis=-1)
+    counts = np.concatenate([np.zeros(x.shape[:-1] + (window - 1,)), valid.astype(float)], axis=-1)
+    sums = np.lib.stride_tricks.sliding_window_view(padded, window, axis=-1).sum(axis=-1)
+    n = np.lib.stride_tricks.sliding_window_view(counts, window, axis=-1).sum(axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        result = np.where((n >= max(min_periods, 1)), sums / n, np.nan)
+    return _restore(result, squeeze)
+
+def panel_sma(x, window):
+    """`rolling(window).mean()` (window poori hone tak NaN)."""
+    return panel_rolling_mean(x, window)
+
+def panel_ema(x, span=None, alpha=None):
+    """`ewm(span/alpha, adjust=False).mean()` har row par; missing bar par state wahi rehti hai, output NaN."""
+    x, squeeze = _as_2d(x)
+    alpha = alpha if alpha is not None else 2 / (span + 1)
+    # Recursion pandas ke compiled ewm mein (har symbol ek column); ignore_na missing bar ko skip karta hai
+    result = pd.DataFrame(x.T).ewm(alpha=alpha, adjust=False, ignore_na=True).mean().to_numpy().T.copy()
+    result[np.isnan(x)] = np.nan
+    return _restore(result, squeeze)
+
+def _price_delta(close):
+    """Har bar ka change pichhle available close se (missing bars ke paar); pehle bar / missing bar par NaN."""
+    valid = ~np.isnan(close)
+    idx = np.where(valid, np.arange(close.shape[-1]), 0)
+    np.maximum.accumulate(idx, axis=-1, out=idx)
+    prev_valid = np.take_along_axis(close, idx, axis=-1)
+    delta = np.full(close.shape, np.nan)
+    delta[:, 1:] = close[:, 1:] - prev_valid[:, :-1]
+    # Pehla valid bar ka koi pichhla close nahi hota
+    first_valid = np.cumsum(valid, axis=-1) == 1
+    delta[first_valid] = np.nan
+    return delta
+
+def _rsi_from(up, down):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return 100 - (100 / (1 + up / down))
+
+def panel_rsi_sma(close, period=14):
+    """RSI_VWAP_VOL_msg_2.rsi jaisa RSI: gains/losses ka simple rolling mean (min_periods=1)."""
+    close, squeeze = _as_2d(close)
+    delta = _price_delta(close)
+    up = np.where(delta > 0, delta, np.where(np.isnan(delta), np.nan, 0.0))
+    down = np.where(delta < 0, -delta, np.where(np.isnan(delta), np.nan, 0.0))
+    result = _rsi_from(panel_rolling_mean(up, period, 1), panel_rolling_mean(down, period, 1))
+    result[np.isnan(close)] = np.nan
+    return _restore(result, squeeze)
+
+def panel_rsi_wilder(close, period=14):
+    """auto_analysis jaisa Wilder RSI: gains/losses par `ewm(alpha=1/period, adjust=False)`."""
+    close, squeeze = _as_2d(close)
+    missing = np.isnan(close)
+    delta = _price_delta(close)
+    # pandas `delta.where(delta > 0, 0)` pehle delta ko 0 maanta hai; missing bar NaN hi rehta hai
+    gain = np.where(missing, np.nan, np.where(delta > 0, delta, 0.0))
+    loss = np.where(missing, np.nan, np.where(delta < 0, -delta, 0.0))
+    result = _rsi_from(panel_ema(gain, alpha=1 / period), panel_ema(loss, alpha=1 / period))
+    return _restore(result, squeeze)
+
+# ================= Checkpoint =================
+def save_indicator_states(states, path):
+    """Symbol -> SymbolIndicators dict ko disk par save karein (atomic replace)."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(states, f)
+    os.replace(tmp_path, path)
+
+def load_indicator_states(path):
+    """Checkpoint file se states wapas laayein; file na ho ya kharab ho to khaali dict."""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except Exception as e:
+        print(f"Indicator checkpoint load nahi hua, shuru se banenge: {e}")
+        return {}
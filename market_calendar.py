@@ -0,0 +1,210 @@
+import datetime as dt
+import os
+import time
+
+import pandas as pd
+
+MARKET_TZ = "Asia/Kolkata"
+SESSION_OPEN = dt.time(9, 15)
+SESSION_CLOSE = dt.time(15, 30)
+HOLIDAY_FILE = "nse_holidays.txt"
+
+# ================= Calendar =================
+def load_holidays(path=HOLIDAY_FILE):
+    """Holiday file (har line par YYYY-MM-DD, '#' ke baad comment) se dates ka set."""
+    holidays = set()
+    try:
+        with open(path, "r") as f:
+            for line in f:
+                line = line.split("#", 1)[0].strip()
+                if line:
+                    holidays.add(dt.date.fromisoformat(line))
+    except FileNotFoundError:
+        print(f"{path} nahi mili, sirf weekends ko band maana jayega.")
+    return holidays
+
+class MarketCalendar:
+    """NSE trading sessions: Mon-Fri 09:15-15:30 IST, holiday list ke din chhod kar.
+
+    Bars session open se `bar_minutes` ke steps mein bante hain; agar session bar size se poora
+    nahi batta (jaise 1h), to aakhri bar session close par band hota hai.
+    """
+
+    def __init__(self, holidays=(), open_time=SESSION_OPEN, close_time=SESSION_CLOSE, tz=MARKET_TZ):
+        self.holidays = set(holidays)
+        self.open_time = open_time
+        self.close_time = close_time
+        self.tz = tz
+
+    @classmethod
+    def from_file(cls, path=HOLIDAY_FILE):
+        return cls(load_holidays(path))
+
+    def now(self, clock=time.time):
+        return self.to_market_time(clock())
+
+    def to_market_time(self, ts):
+        """Epoch seconds ya Timestamp ko market timezone ke Timestamp mein badlein."""
+        if isinstance(ts, (int, float)):
+            return pd.Timestamp(ts, unit="s", tz="UTC").tz_convert(self.tz)
+        ts = pd.Timestamp(ts)
+        return ts.tz_localize(self.tz) if ts.tzinfo is None else ts.tz_convert(self.tz)
+
+    def is_trading_day(self, day):
+        return day.weekday() < 5 and day not in self.holidays
+
+    def session(self, day):
+        """Din ka (open, close) Timestamp pair."""
+        return (pd.Timestamp.combine(day, self.open_time).tz_localize(self.tz),
+                pd.Timestamp.combine(day, self.close_time).tz_localize(self.tz))
+
+    def is_open(self, ts):
+        ts = self.to_market_time(ts)
+        if not self.is_trading_day(ts.date()):
+            return False
+        open_, close = self.session(ts.date())
+        return open_ <= ts < close
+
+    def next_trading_day(self, day):
+        day += dt.timedelta(days=1)
+        while not self.is_trading_day(day):
+            day += dt.timedelta(days=1)
+        return day
+
+    def previous_trading_day(self, day):
+        day -= dt.timedelta(days=1)
+        while not self.is_trading_day(day):
+            day -= dt.timedelta(days=1)
+        return day
+
+    def bar_closes(self, day, bar_minutes):
+        """Ek trading din ke saare bar close times (session close tak)."""
+        open_, close = self.session(day)
+        closes = list(pd.date_range(open_ + pd.Timedelta(minutes=bar_minutes), close, freq=f"{bar_minutes}min"))
+        if not closes or closes[-1] != close:
+            closes.append(close)
+        return closes
+
+    def last_bar_close(self, ts, bar_minutes):
+        """`ts` ya usse pehle band hua aakhri bar (pichhle trading din tak dekhta hai)."""
+        ts = self.to_market_time(ts)
+        day = ts.date()
+        if self.is_trading_day(day):
+            closed = [c for c in self.bar_closes(day, bar_minutes) if c <= ts]
+            if closed:
+                return closed[-1]
+        return self.session(self.previous_trading_day(day))[1]
+
+    def next_bar_close(self, ts, bar_minutes):
+        """`ts` ke baad band hone wala pehla bar."""
+        ts = self.to_market_time(ts)
+        day = ts.date()
+        if self.is_trading_day(day):
+            upcoming = [c for c in self.bar_closes(day, bar_minutes) if c > ts]
+            if upcoming:
+                return upcoming[0]
+        return self.bar_closes(self.next_trading_day(day), bar_minutes)[0]
+
+# ================= Scheduler =================
+class BarCloseScheduler:
+    """Har bar close ke `offset_seconds` baad job chalata hai, sirf market ke session mein.
+
+    - Job synchronous hai, isliye do cycles kabhi overlap nahi karte.
+    - `last_run` (pichhla process kiya hua bar close) ke baad ke band bars chhoot gaye hon, jaise restart
+      ke baad ya kisi cycle ke agle bar close se lamba chalne par, to job har chhoote bar close ke liye
+      purane se naye order mein turant chalta hai (catch-up), uske baad agle bar close ka intezaar.
+      Sirf aakhri `max_catch_up` closes (default: ek poora session) chalte hain, usse purane chhod diye
+      jaate hain (`skipped` mein gine jaate hain), kyunki live fetch window mein unka data nahi hota.
+    - Market band ho (raat, weekend, holiday) to agle session ke pehle bar close tak soya rehta hai.
+    - `state_path` diya ho to `last_run` har job ke baad wahan save hota hai aur start par wahin se aata hai.
+    """
+
+    def __init__(self, calendar, bar_minutes=15, offset_seconds=20, last_run=None, state_path=None,
+                 clock=time.time, sleep=time.sleep, max_sleep=60, max_catch_up=None):
+        self.calendar = calendar
+        self.bar_minutes = bar_minutes
+        self.offset = pd.Timedelta(seconds=offset_seconds)
+        self.state_path = state_path
+        if last_run is None and state_path is not None:
+            last_run = load_last_run(state_path)
+        self.last_run = calendar.to_market_time(last_run) if last_run is not None else None
+        self.clock = clock
+        self.sleep = sleep
+        self.max_sleep = max_sleep  # Lambi neend tukdon mein, taaki system suspend/clock change ke baad bhi time par jaage
+        if max_catch_up is None:
+            session_minutes = (dt.datetime.combine(dt.date.min, calendar.close_time)
+                               - dt.datetime.combine(dt.date.min, calendar.open_time)).total_seconds() / 60
+            max_catch_up = -(-int(session_minutes) // bar_minutes)
+        self.max_catch_up = max_catch_up
+        self.skipped = 0
+
+    def next_due(self):
+        """Agla bar close jiske liye job chalna hai (jo pehle se due ho woh bhi)."""
+        latest = self.calendar.last_bar_close(self.calendar.now(self.clock) - self.offset, self.bar_minutes)
+        if self.last_run is None or latest > self.last_run:
+            return latest
+        return self.calendar.next_bar_close(self.last_run, self.bar_minutes)
+
+    def wait_for(self, bar_close):
+        """`bar_close + offset` tak sleep karein."""
+        due = (bar_close + self.offset).timestamp()
+        while True:
+            remaining = due - self.clock()
+            if remaining <= 0:
+                return
+            self.sleep(min(remaining, self.max_sleep))
+
+    def run_once(self, job):
+        """Agle due bar close tak rukein, phir har chhoote bar close aur us close ke liye job(bar_close).
+
+        Aakhri job ka result return hota hai.
+        """
+        bar_close = self.next_due()
+        self.wait_for(bar_close)
+        closes = [bar_close] if self.last_run is None else self._closes_between(self.last_run, bar_close)
+        if len(closes) > self.max_catch_up:
+            dropped = len(closes) - self.max_catch_up
+            self.skipped += dropped
+            closes = closes[-self.max_catch_up:]
+            print(f"{dropped} purane bar close(s) chhod diye, {closes[0]} se catch-up ho raha hai.")
+        elif len(closes) > 1:
+            print(f"{len(closes) - 1} bar close(s) chhoot gaye the, {closes[0]} se catch-up ho raha hai.")
+        for close in closes:
+            result = job(close)
+            self.last_run = close
+            if self.state_path is not None:
+                save_last_run(self.state_path, close)
+        return result
+
+    def run(self, job):
+        """Hamesha chalta rehta hai: har due bar close par job(bar_close)."""
+        while True:
+            self.run_once(job)
+
+    def _closes_between(self, start, end):
+        """(start, end] ke beech ke bar closes (sirf trading sessions ke)."""
+        closes = []
+        t = start
+        while t < end:
+            t = self.calendar.next_bar_close(t, self.bar_minutes)
+            if t <= end:
+                closes.append(t)
+        return closes
+
+def save_last_run(path, bar_close):
+    """Aakhri process kiya hua bar close file mein likhein (atomic replace)."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(bar_close.isoformat())
+    os.replace(tmp_path, path)
+
+def load_last_run(path):
+    """Saved bar close wapas laayein; file na ho ya kharab ho to None."""
+    try:
+        with open(path, "r") as f:
+            return pd.Timestamp(f.read().strip())
+    except FileNotFoundError:
+        return None
+    except ValueError as e:
+        print(f"{path} padhi nahi ja saki, scheduler shuru se chalega: {e}")
+        return None
@@ -0,0 +1,404 @@
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+# ================= Configuration =================
+BAR_STORE_DIR = "bar_store"
+SESSION_OPEN = "09:15:00" # NSE session open (IST); intraday resampled bars isi se gine jaate hain
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+# Intraday intervals minutes mein; "1d" alag se handle hota hai (ek trading date = ek bar)
+INTERVAL_MINUTES = {"1m": 1, "2m": 2, "5m": 5, "15m": 15, "30m": 30, "60m": 60, "90m": 90, "1h": 60}
+
+# Period string ko approx calendar days mein badalne ke liye (coverage check ke liye)
+_PERIOD_UNIT_DAYS = {"d": 1, "wk": 7, "mo": 31, "y": 366}
+_PERIOD_RE = re.compile(r"^(\d+)(d|wk|mo|y)$")
+
+def period_days(period):
+    """'2d', '3mo', '1y' jaise period ko approx days mein badlein ('max' = infinity)."""
+    if period == "max":
+        return float("inf")
+    match = _PERIOD_RE.match(period)
+    if not match:
+        raise ValueError(f"Unknown period: {period}")
+    return int(match.group(1)) * _PERIOD_UNIT_DAYS[match.group(2)]
+
+def slice_period(df, period):
+    """Stored bars mein se sirf requested period wala hissa nikaalein.
+
+    'Nd' ka matlab aakhri N trading dates (yfinance ki tarah), baaki periods calendar offset hain.
+    """
+    if df.empty or period == "max":
+        return df
+    match = _PERIOD_RE.match(period)
+    if not match:
+        raise ValueError(f"Unknown period: {period}")
+    count, unit = int(match.group(1)), match.group(2)
+    if unit == "d":
+        dates = df.index.normalize()
+        keep = dates.unique()[-count:]
+        return df[dates.isin(keep)]
+    offsets = {"wk": pd.DateOffset(weeks=count), "mo": pd.DateOffset(months=count), "y": pd.DateOffset(years=count)}
+    start = df.index[-1] - offsets[unit]
+    return df[df.index > start]
+
+# ================= Providers =================
+class YFinanceProvider:
+    """yfinance se bars laata hai. Har call ek network request hai."""
+
+    def __init__(self, auto_adjust=False, timeout=10):
+        self.auto_adjust = auto_adjust
+        self.timeout = timeout
+
+    def history(self, symbol, interval, period=None, start=None):
+        import yfinance as yf  # Fake provider ke saath offline chalane ke liye yahan import karein
+        if start is not None:
+            return yf.Ticker(symbol).history(start=start, interval=interval, auto_adjust=self.auto_adjust,
+                                             timeout=self.timeout)
+        return yf.Ticker(symbol).history(period=period, interval=interval, auto_adjust=self.auto_adjust,
+                                         timeout=self.timeout)
+
+class FakeProvider:
+    """Offline testing ke liye deterministic bars banata hai (network ke bina).
+
+    Bars symbol ke naam se seeded random walk hain, `start` se `clock()` tak ke NSE session
+    (09:15-15:30 IST, Mon-Fri) par. `calls` aur `bars_served` se network load measure kar sakte hain.
+    `latency` (seconds, ya symbol -> seconds wala function) har call mein network jaisi deri daalta hai.
+    """
+
+    _FREQ = {"1m": "1min", "5m": "5min", "15m": "15min", "30m": "30min", "1h": "60min", "1d": "1D"}
+
+    def __init__(self, start="2024-01-01", clock=None, latency=0.0):
+        self.start = pd.Timestamp(start, tz="Asia/Kolkata")
+        self.clock = clock or (lambda: pd.Timestamp.now(tz="Asia/Kolkata"))
+        self.latency = latency
+        self.calls = 0
+        self.bars_served = 0
+        self._lock = threading.Lock()
+
+    def _bars(self, symbol, interval):
+        now = self.clock()
+        if interval == "1d":
+            index = pd.bdate_range(self.start.normalize(), now.normalize(), tz="Asia/Kolkata")
+        else:
+            index = pd.date_range(self.start.normalize(), now, freq=self._FREQ[interval], tz="Asia/Kolkata")
+            index = index[(index.dayofweek < 5) & (index.time >= pd.Timestamp("09:15").time())
+                          & (index.time < pd.Timestamp("15:30").time())]
+            # Sirf woh bars jo poori tarah ban chuke hain ya abhi ban rahe hain
+            index = index[index <= now]
+        index.name = "Datetime" if interval != "1d" else "Date"
+
+        # Har bar ka data sirf symbol aur bar ki position par depend karta hai, isliye har call par same aata hai
+        seed = sum(ord(c) * (i + 1) for i, c in enumerate(symbol)) % (2 ** 32)
+        n = len(index)
+        # (n, 3) shape mein draw karne se pehle ke bars naye bars aane par nahi badalte
+        draws = np.random.default_rng(seed).standard_normal((n, 3))
+        close = 100 * np.exp(np.cumsum(draws[:, 0] * 0.004))
+        spread = np.abs(draws[:, 1]) * 0.003 * close
+        open_ = np.concatenate([[close[0]], close[:-1]]) if n else close
+        return pd.DataFrame({
+            "Open": open_,
+            "High": np.maximum(open_, close) + spread,
+            "Low": np.minimum(open_, close) - spread,
+            "Close": close,
+            "Volume": np.floor(1_000 + np.abs(draws[:, 2]) * 30_000),
+        }, index=index)
+
+    def history(self, symbol, interval, period=None, start=None):
+        delay = self.latency(symbol) if callable(self.latency) else self.latency
+        if delay:
+            time.sleep(delay)
+        bars = self._bars(symbol, interval)
+        if start is not None:
+            bars = bars[bars.index >= pd.Timestamp(start)]
+        elif period is not None:
+            bars = slice_period(bars, period)
+        with self._lock:
+            self.calls += 1
+            self.bars_served += len(bars)
+        return bars
+
+# ================= Bar store =================
+class BarStore:
+    """Symbol aur interval ke hisaab se bars disk par rakhta hai (root/interval/symbol.parquet).
+
+    pyarrow na ho to pickle par fallback karta hai. Har file ke saath ek chhota meta JSON hota hai
+    jisme sabse bada fetch kiya gaya period likha hota hai.
+    """
+
+    def __init__(self, root=BAR_STORE_DIR):
+        self.root = root
+        try:
+            import pyarrow  # noqa: F401
+            self.ext = "parquet"
+        except ImportError:
+            self.ext = "pkl"
+
+    def _path(self, symbol, interval, ext):
+        return os.path.join(self.root, interval, f"{symbol}.{ext}")
+
+    def load(self, symbol, interval):
+        path = self._path(symbol, interval, self.ext)
+        if not os.path.exists(path):
+            return None
+        if self.ext == "parquet":
+            return pd.read_parquet(path)
+        return pd.read_pickle(path)
+
+    def load_meta(self, symbol, interval):
+        path = self._path(symbol, interval, "meta.json")
+        if not os.path.exists(path):
+            return {}
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def save(self, symbol, interval, df, meta=None):
+        path = self._path(symbol, interval, self.ext)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Pehle temp file mein likhein, phir replace karein, taaki crash par file aadhi na rahe.
+        # Temp naam thread ke hisaab se alag hai, kyunki concurrent fetch mein retry aur purana
+        # (timeout hua) attempt ek hi symbol ko saath mein likh sakte hain.
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        if self.ext == "parquet":
+            df.to_parquet(tmp_path)
+        else:
+            df.to_pickle(tmp_path)
+        os.replace(tmp_path, path)
+        if meta is not None:
+            meta_path = self._path(symbol, interval, "meta.json")
+            with open(meta_path + ".tmp", "w") as f:
+                json.dump(meta, f)
+            os.replace(meta_path + ".tmp", meta_path)
+
+class CachedProvider:
+    """Kisi bhi provider ke aage local BarStore lagata hai.
+
+    Pehli baar poora period fetch hota hai; uske baad sirf aakhri do stored bars (aakhri shayad
+    tab ban raha tha) aur uske baad ke bars fetch hote hain. History disk se serve hoti hai.
+    Aakhri se pehle wala (poora bana) bar dobara aaye hue bar se match na kare (split/dividend ke
+    baad Yahoo purane prices rescale karta hai), ya aaye hi nahi (outage provider ki intraday window
+    se lamba), to stored history par bharosa nahi: poora period dobara fetch hota hai.
+    """
+
+    def __init__(self, provider, store=None):
+        self.provider = provider
+        self.store = store or BarStore()
+
+    def history(self, symbol, interval, period):
+        stored = self.store.load(symbol, interval)
+        meta = self.store.load_meta(symbol, interval)
+        covered = meta.get("period")
+
+        if stored is None or stored.empty or covered is None or period_days(period) > period_days(covered):
+            fetched = self.provider.history(symbol, interval, period=period)
+            merged = fetched if stored is None else _merge_bars(stored, fetched)
+            covered = period if covered is None or period_days(period) > period_days(covered) else covered
+        else:
+            check_time = stored.index[-2] if len(stored) > 1 else stored.index[-1]
+            fetched = self.provider.history(symbol, interval, start=check_time)
+            if _same_bar(stored, fetched, check_time):
+                merged = _merge_bars(stored, fetched)
+            else:
+                print(f"{symbol} {interval}: stored history match nahi hui, poora {covered} dobara fetch ho raha hai.")
+                merged = self.provider.history(symbol, interval, period=covered)
+
+        if not merged.empty:
+            self.store.save(symbol, interval, merged, meta={"period": covered})
+        return slice_period(merged, period)
+
+def _same_bar(stored, fetched, time, rtol=1e-4):
+    """`time` wala bar dono frames mein hai aur uske OHLC prices (float noise chhod kar) same hain."""
+    if fetched is None or time not in fetched.index:
+        return False
+    columns = ["Open", "High", "Low", "Close"]
+    return bool(np.allclose(stored.loc[time, columns].to_numpy(dtype=float),
+                            fetched.loc[time, columns].to_numpy(dtype=float), rtol=rtol))
+
+def _merge_bars(stored, fetched):
+    """Naye bars ko stored bars ke saath jodein; same timestamp par naya bar jeetta hai."""
+    if fetched is None or fetched.empty:
+        return stored
+    merged = pd.concat([stored, fetched])
+    merged = merged[~merged.index.duplicated(keep="last")]
+    return merged.sort_index()
+
+
+# ================= Resampling =================
+def resample_bars(df, interval, session_open=SESSION_OPEN):
+    """Base OHLCV bars ko bade interval mein jodein (Open first, High max, Low min, Close last, Volume sum).
+
+    Intraday bins har din session open (09:15 IST) se gine jaate hain, isliye 1h bars 09:15, 10:15,
+    ..., 15:15 par label hote hain (aakhri bar 15:30 par chhota band hota hai). Daily bar us trading
+    date ki midnight par label hota hai, yfinance ke 1d bars ki tarah.
+    """
+    if df.empty:
+        return df[OHLCV_COLUMNS].iloc[:0]
+    day = df.index.normalize()
+    if interval == "1d":
+        labels = day
+        name = "Date"
+    else:
+        freq = pd.Timedelta(minutes=INTERVAL_MINUTES[interval])
+        session_start = day + pd.Timedelta(session_open)
+        labels = session_start + ((df.index - session_start) // freq) * freq
+        name = "Datetime"
+    bars = df[OHLCV_COLUMNS].groupby(labels, sort=True).agg(
+        {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"})
+    bars.index.name = name
+    return bars
+
+def check_resample(base_interval, interval):
+    """`base_interval` se `interval` ban sakta hai ya nahi; na ban sake to ValueError."""
+    if interval == "1d":
+        if base_interval != "1d" and base_interval not in INTERVAL_MINUTES:
+            raise ValueError(f"Unknown base interval: {base_interval}")
+        return
+    if base_interval == "1d" or interval not in INTERVAL_MINUTES or base_interval not in INTERVAL_MINUTES \
+            or INTERVAL_MINUTES[interval] % INTERVAL_MINUTES[base_interval]:
+        raise ValueError(f"{interval} bars {base_interval} bars se nahi ban sakte")
+
+class ResamplingProvider:
+    """Har symbol ka sirf ek base interval fetch karta hai; baaki timeframes locally resample hote hain.
+
+    `base_interval` default hai, `symbol_intervals` se kisi symbol ka alag base de sakte hain. Base
+    interval wali request seedhe `provider` (aam taur par CachedProvider) ko jaati hai. Bade interval
+    ke derived bars `store` mein `<interval>_from_<base>` ke naam se cache hote hain; agli baar sirf
+    aakhri derived bar (jo shayad adhoora tha) se naye base bars dobara jode jaate hain.
+    Base bars `refresh_seconds` tak memory mein rehte hain, isliye ek hi symbol ke kai timeframes
+    maangne par network request sirf pehli baar hoti hai.
+    """
+
+    def __init__(self, provider, base_interval="15m", symbol_intervals=None, store=None, refresh_seconds=60):
+        self.provider = provider
+        self.base_interval = base_interval
+        self.symbol_intervals = dict(symbol_intervals or {})
+        self.store = store or getattr(provider, "store", None) or BarStore()
+        self.refresh_seconds = refresh_seconds
+        self._recent = {}  # (symbol, base interval) -> (fetch time, period, bars)
+
+    def base_for(self, symbol):
+        return self.symbol_intervals.get(symbol, self.base_interval)
+
+    def _base_bars(self, symbol, base_interval, period):
+        recent = self._recent.get((symbol, base_interval))
+        if recent is not None:
+            fetched_at, covered, bars = recent
+            if time.monotonic() - fetched_at < self.refresh_seconds and period_days(period) <= period_days(covered):
+                return slice_period(bars, period)
+        bars = self.provider.history(symbol, base_interval, period)
+        self._recent[(symbol, base_interval)] = (time.monotonic(), period, bars)
+        return bars
+
+    def history(self, symbol, interval, period):
+        base_interval = self.base_for(symbol)
+        if interval == base_interval:
+            return self._base_bars(symbol, interval, period)
+        check_resample(base_interval, interval)
+        base = self._base_bars(symbol, base_interval, period)
+        if base.empty:
+            return resample_bars(base, interval)
+
+        key = f"{interval}_from_{base_interval}"
+        derived = self.store.load(symbol, key)
+        covered_from = self.store.load_meta(symbol, key).get("from")
+        if derived is not None and not derived.empty and base.index[0] > derived.index[-1]:
+            # Downtime ke baad chhota period: aakhri derived bar tak ke base bars bhi laayein, warna beech
+            # ke din hamesha ke liye chhoot jaate
+            gap_days = (base.index[-1].normalize() - derived.index[-1].normalize()).days + 1
+            base = self._base_bars(symbol, base_interval, f"{gap_days}d")
+            if base.index[0] > derived.index[-1]:
+                # Provider itna peeche ka data nahi deta: jitna mila usi se poora resample
+                derived = None
+        if derived is None or derived.empty or covered_from is None or base.index[0] < pd.Timestamp(covered_from):
+            # Pehli baar, ya base ab pehle se zyada peeche tak hai: poora resample
+            merged = resample_bars(base, interval)
+            covered_from = base.index[0]
+        else:
+            # Aakhri derived bar naye base bars ke saath dobara banta hai, baaki waise hi rehte hain
+            merged = _merge_bars(derived, resample_bars(base[base.index >= derived.index[-1]], interval))
+        self.store.save(symbol, key, merged, meta={"from": pd.Timestamp(covered_from).isoformat()})
+        return slice_period(merged, period)
+
+
+# ================= Concurrent fetch =================
+class RateLimiter:
+    """Thread-safe limiter: do requests ke shuru hone ke beech kam se kam 1/rate seconds."""
+
+    def __init__(self, rate_per_sec=None):
+        self.interval = 1.0 / rate_per_sec if rate_per_sec else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait_for = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait_for > 0:
+            time.sleep(wait_for)
+
+def fetch_concurrent(provider, symbols, interval, period, max_workers=8, rate_per_sec=None,
+                     timeout=30, retries=2, backoff=1.0, on_timing=None):
+    """Saare symbols ke bars thread pool mein parallel fetch karta hai.
+
+    Generator hai: jaise hi kisi symbol ka data aata hai, (symbol, data, error) yield hota hai,
+    taaki signal evaluation baaki downloads ke chalte hue shuru ho sake. Har attempt ka apna
+    `timeout` hai; fail ya timeout hone par `retries` baar exponential backoff ke saath dobara
+    try hota hai, phir error yield hota hai. Ek slow symbol poore cycle ko nahi rokta.
+    `on_timing(symbol, seconds)` har poore (ya timeout hue) attempt ke baad call hota hai.
+    """
+    limiter = RateLimiter(rate_per_sec)
+    # Timeout hue attempts thread ko pakde rehte hain, isliye retries ke liye thoda extra jagah
+    executor = ThreadPoolExecutor(max_workers=max_workers + retries)
+    pending = {}  # future -> [symbol, attempt number, attempt start time]
+
+    def run_attempt(symbol, attempt, state):
+        if attempt:
+            time.sleep(backoff * 2 ** (attempt - 1))
+        limiter.acquire()
+        state[2] = time.monotonic()
+        return provider.history(symbol, interval, period)
+
+    def submit(symbol, attempt):
+        state = [symbol, attempt, None]
+        pending[executor.submit(run_attempt, symbol, attempt, state)] = state
+
+    try:
+        for symbol in symbols:
+            submit(symbol, 0)
+        while pending:
+            done, _ = wait(list(pending), timeout=min(timeout, 0.5), return_when=FIRST_COMPLETED)
+            for future in done:
+                symbol, attempt, started = pending.pop(future)
+                if on_timing is not None and started is not None:
+                    on_timing(symbol, time.monotonic() - started)
+                try:
+                    data = future.result()
+                except Exception as e:
+                    if attempt < retries:
+                        submit(symbol, attempt + 1)
+                    else:
+                        yield symbol, None, e
+                    continue
+                yield symbol, data, None
+
+            now = time.monotonic()
+            for future, (symbol, attempt, started) in list(pending.items()):
+                if started is not None and now - started > timeout:
+                    # Atka hua attempt chhod dein; uska result ab ignore hoga
+                    del pending[future]
+                    if on_timing is not None:
+                        on_timing(symbol, now - started)
+                    if attempt < retries:
+                        submit(symbol, attempt + 1)
+                    else:
+                        yield symbol, None, TimeoutError(f"{symbol}: {timeout}s mein data nahi aaya")
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
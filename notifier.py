@@ -0,0 +1,188 @@
+import os
+import queue
+import threading
+import time
+
+import requests
+
+# ================= Toggle file =================
+class ToggleFile:
+    """telegram_toggle.txt ka cached reader: file sirf tab dobara padhi jaati hai jab uska mtime badle."""
+
+    def __init__(self, path, default=True):
+        self.path = path
+        self.default = default
+        self._mtime = None
+        self._value = default
+
+    def enabled(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            self._mtime = None
+            self._value = self.default  # Default roop se messages on rakhein
+            return self._value
+        except OSError as e:
+            print(f"File reading error: {e}")
+            return self.default
+        if mtime != self._mtime:
+            try:
+                with open(self.path, "r") as f:
+                    self._value = f.read().strip().lower() == "on"
+                self._mtime = mtime
+            except OSError as e:
+                print(f"File reading error: {e}")
+                return self.default  # Error aane par bhi messages on rakhein
+        return self._value
+
+# ================= Dispatcher =================
+class TelegramDispatcher:
+    """Background thread jo Telegram messages bhejta hai, taaki signal processing na ruke.
+
+    - Bounded queue: queue bhari ho to naya message drop hota hai (loop kabhi block nahi hota).
+    - Ek pooled `requests.Session`, har request par explicit timeout.
+    - Fail hone par exponential backoff; HTTP 429 par Telegram ka `retry_after` maana jaata hai.
+    - Rate limit: do messages ke beech kam se kam `min_interval` seconds (Bot API: ~1 msg/sec per chat).
+    - `coalesce()` ke andar ke messages ek hi message mein jod kar bheje jaate hain.
+    """
+
+    MAX_MESSAGE_LENGTH = 4096  # Bot API ki limit
+
+    def __init__(self, token, chat_id, toggle=None, api_url="https://api.telegram.org", timeout=(5, 10),
+                 max_queue=1000, max_retries=5, backoff=1.0, min_interval=1.0, session=None):
+        self.url = f"{api_url}/bot{token}/sendMessage"
+        self.chat_id = chat_id
+        self.toggle = toggle
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.min_interval = min_interval
+        self.session = session or requests.Session()
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.sent = 0
+        self.dropped = 0
+        self.failed = 0
+        self._next_send = 0.0
+        self._coalescing = 0
+        self._pending = []
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="telegram-dispatcher", daemon=True)
+        self._thread.start()
+
+    # ---------- Producer side ----------
+    def send(self, message):
+        """Message queue mein daalein (non-blocking). Toggle off ho to kuch nahi bhejta."""
+        if self.toggle is not None and not self.toggle.enabled():
+            print("Telegram messages off hain, message nahi bheja gaya.")
+            return
+        with self._lock:
+            if self._coalescing:
+                self._pending.append(message)
+                return
+        self._enqueue(message)
+
+    def coalesce(self):
+        """Context manager: andar ke saare messages block ke end par ek message ban kar jaate hain."""
+        return _Coalesce(self)
+
+    def _enqueue(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            self.dropped += 1
+            print("Telegram queue bhari hai, message drop hua.")
+
+    def _flush_pending(self):
+        with self._lock:
+            messages, self._pending = self._pending, []
+        for chunk in _join_messages(messages, self.MAX_MESSAGE_LENGTH):
+            self._enqueue(chunk)
+
+    def flush(self, timeout=None):
+        """Queue khaali hone tak rukein (shutdown ke pehle). timeout ke baad False."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    # ---------- Worker side ----------
+    def _run(self):
+        while True:
+            message = self.queue.get()
+            try:
+                self._deliver(message)
+            finally:
+                self.queue.task_done()
+
+    def _deliver(self, message):
+        payload = {"chat_id": self.chat_id, "text": message}
+        for attempt in range(self.max_retries + 1):
+            wait_for = self._next_send - time.monotonic()
+            if wait_for > 0:
+                time.sleep(wait_for)
+            self._next_send = time.monotonic() + self.min_interval
+            retry_after = None
+            try:
+                response = self.session.post(self.url, data=payload, timeout=self.timeout)
+                if response.status_code == 200:
+                    self.sent += 1
+                    return True
+                if response.status_code == 429:
+                    retry_after = _retry_after(response)
+                elif 400 <= response.status_code < 500:
+                    # Galat request dobara bhejne se theek nahi hogi
+                    print(f"Telegram Error: HTTP {response.status_code} {response.text[:200]}")
+                    break
+                else:
+                    print(f"Telegram Error: HTTP {response.status_code}")
+            except requests.RequestException as e:
+                print(f"Telegram Error: {e}")
+            if attempt < self.max_retries:
+                time.sleep(retry_after if retry_after is not None else self.backoff * 2 ** attempt)
+        self.failed += 1
+        return False
+
+class _Coalesce:
+    def __init__(self, dispatcher):
+        self.dispatcher = dispatcher
+
+    def __enter__(self):
+        with self.dispatcher._lock:
+            self.dispatcher._coalescing += 1
+        return self.dispatcher
+
+    def __exit__(self, *exc):
+        with self.dispatcher._lock:
+            self.dispatcher._coalescing -= 1
+            done = not self.dispatcher._coalescing
+        if done:
+            self.dispatcher._flush_pending()
+        return False
+
+def _retry_after(response):
+    """429 response se retry_after seconds (JSON body ya Retry-After header se)."""
+    try:
+        return float(response.json()["parameters"]["retry_after"])
+    except Exception:
+        pass
+    try:
+        return float(response.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+def _join_messages(messages, limit):
+    """Messages ko blank line se jod kar `limit` se chhote chunks banayein."""
+    chunks = []
+    current = ""
+    for message in messages:
+        candidate = f"{current}\n\n{message}" if current else message
+        if len(candidate) > limit and current:
+            chunks.append(current)
+            current = message
+        else:
+            current = candidate
+    if current:
+        chunks.append(current)
+    return chunks
@@ -0,0 +1,303 @@
+import heapq
+
+import numpy as np
+import pandas as pd
+
+from indicators import panel_rolling_mean, panel_rsi_sma, session_vwap
+from market_data import INTERVAL_MINUTES
+
+# Exit reasons (position records mein int8 code, journal/CSV mein text)
+EXIT_SL, EXIT_TARGET, EXIT_END = 0, 1, 2
+EXIT_REASONS = np.array(["SL", "Target", "Open"], dtype=object)
+
+# Ek position ka compact record; DataFrame sirf end mein ek baar banta hai
+POSITION_DTYPE = np.dtype([
+    ("symbol", np.int32), ("direction", np.int8), ("reason", np.int8), ("quantity", np.int64),
+    ("entry_time", "datetime64[ns]"), ("exit_time", "datetime64[ns]"),
+    ("entry", np.float64), ("sl", np.float64), ("target", np.float64), ("exit", np.float64),
+    ("pnl", np.float64),
+])
+
+PORTFOLIO_COLUMNS = ["Stock", "Direction", "Quantity", "Entry Time", "Entry", "SL", "Target",
+                     "Exit Time", "Exit", "Result", "PnL"]
+
+# ================= Signals aur exits (per symbol, vectorized) =================
+def strategy_signals(data, rsi_period=14, rsi_low=30, rsi_high=70, volume_multiplier=1,
+                     volume_window=20, stop_buffer=0.005, risk_reward=2, vwap_sessions=2):
+    """Live check_signal wali entries poore data par ek saath.
+
+    Indicators live loop jaise hain: VWAP aakhri `vwap_sessions` sessions par, simple RSI aur
+    20-bar VolumeAvg. Entry band bar ke Close par; SL = VWAP*(1 -/+ stop_buffer), target =
+    entry -/+ risk * risk_reward. Returns (bar idx, direction, entry, sl, target) arrays.
+    """
+    high = data["High"].to_numpy(dtype=float)
+    low = data["Low"].to_numpy(dtype=float)
+    close = data["Close"].to_numpy(dtype=float)
+    volume = data["Volume"].to_numpy(dtype=float)
+    # Session key = local trading date (datetime64[D]; Python date objects banane se kaafi tez)
+    local = data.index.tz_localize(None) if data.index.tz is not None else data.index
+    vwap_values = session_vwap(high, low, close, volume, np.asarray(local, dtype="datetime64[D]"), vwap_sessions)
+    rsi_values = panel_rsi_sma(close, rsi_period)
+    volume_ok = volume > volume_multiplier * panel_rolling_mean(volume, volume_window, 1)
+
+    long_mask = (close > vwap_values) & (rsi_values < rsi_low) & volume_ok
+    short_mask = (close < vwap_values) & (rsi_values > rsi_high) & volume_ok & ~long_mask
+    idx = np.flatnonzero(long_mask | short_mask)
+    direction = np.where(long_mask[idx], 1, -1).astype(np.int8)
+    entry = close[idx]
+    sl = vwap_values[idx] * (1 - direction * stop_buffer)
+    target = entry + (entry - sl) * risk_reward
+    return idx, direction, entry, sl, target
+
+def find_exits(open_, high, low, close, entry_idx, direction, sl, target, window=32):
+    """Har entry ke baad pehla bar jahan High/Low SL ya target chhoo le.
+
+    Saari entries ek saath `window` bars ke blocks mein scan hoti hain; jo resolve na hon unke
+    liye agla (dugna) block. Ek hi bar mein dono hit hon to SL pehle maana jaata hai. Bar SL/target
+    ke paar gap se khule to fill Open par hota hai. Data khatam hone tak exit na ho to aakhri
+    Close par EXIT_END. Returns (exit idx, exit price, reason) arrays.
+    """
+    n = len(close)
+    count = len(entry_idx)
+    exit_idx = np.full(count, n - 1, dtype=np.int64)
+    exit_price = np.full(count, close[-1] if n else np.nan)
+    reason = np.full(count, EXIT_END, dtype=np.int8)
+    pending = np.arange(count) if n else np.arange(0)
+    start = np.asarray(entry_idx, dtype=np.int64) + 1
+
+    while len(pending):
+        offsets = np.arange(window)
+        bars = start[pending, None] + offsets  # (pending, window)
+        in_range = bars < n
+        bars = np.minimum(bars, n - 1)
+        d = direction[pending, None]
+        stop = sl[pending, None]
+        goal = target[pending, None]
+        bar_low, bar_high = low[bars], high[bars]
+        sl_hit = in_range & np.where(d == 1, bar_low <= stop, bar_high >= stop)
+        target_hit = in_range & np.where(d == 1, bar_high >= goal, bar_low <= goal)
+        hit = sl_hit | target_hit
+        found = hit.any(axis=1)
+
+        rows = np.flatnonzero(found)
+        first = hit[rows].argmax(axis=1)
+        which = pending[rows]
+        j = bars[rows, first]
+        is_sl = sl_hit[rows, first]
+        bar_open = open_[j]
+        long_ = direction[which] == 1
+        sl_fill = np.where(long_, np.minimum(bar_open, sl[which]), np.maximum(bar_open, sl[which]))
+        target_fill = np.where(long_, np.maximum(bar_open, target[which]), np.minimum(bar_open, target[which]))
+        exit_idx[which] = j
+        exit_price[which] = np.where(is_sl, sl_fill, target_fill)
+        reason[which] = np.where(is_sl, EXIT_SL, EXIT_TARGET)
+
+        # Jo entries data ke end tak pahunch gayi unka exit EXIT_END hi rahega
+        unresolved = ~found & (start[pending] + window < n)
+        start[pending[unresolved]] += window
+        pending = pending[unresolved]
+        window *= 2
+
+    return exit_idx, exit_price, reason
+
+def symbol_candidates(data, **params):
+    """Ek symbol ke saare candidate trades (portfolio limits se pehle), compact arrays ke dict mein.
+
+    Times bar start ke hain: entry bar ke Close par, exit bar ke andar. Worker process mein chal sakta hai.
+    """
+    idx, direction, entry, sl, target = strategy_signals(data, **params)
+    exit_idx, exit_price, reason = find_exits(
+        data["Open"].to_numpy(dtype=float), data["High"].to_numpy(dtype=float),
+        data["Low"].to_numpy(dtype=float), data["Close"].to_numpy(dtype=float),
+        idx, direction, sl, target)
+    # Saare symbols ke times ek hi (UTC ns) scale par, taaki merge mein seedha compare hon
+    index = data.index.tz_convert(None) if data.index.tz is not None else data.index
+    times = np.asarray(index, dtype="datetime64[ns]").view(np.int64)
+    return {
+        "entry_time": times[idx], "exit_time": times[exit_idx], "direction": direction,
+        "entry": entry, "sl": sl, "target": target, "exit": exit_price, "reason": reason,
+    }
+
+# ================= Portfolio =================
+class PositionBook:
+    """POSITION_DTYPE records ka growable array (capacity dugni hoti hai, per-trade objects nahi banate)."""
+
+    def __init__(self, capacity=1024):
+        self._data = np.zeros(capacity, dtype=POSITION_DTYPE)
+        self.count = 0
+
+    def add(self, *values):
+        if self.count == len(self._data):
+            grown = np.zeros(len(self._data) * 2, dtype=POSITION_DTYPE)
+            grown[:self.count] = self._data
+            self._data = grown
+        self._data[self.count] = values
+        self.count += 1
+        return self.count - 1
+
+    @property
+    def records(self):
+        return self._data[:self.count]
+
+def simulate_portfolio(candidates, max_positions=10, capital_per_trade=100_000, initial_capital=1_000_000):
+    """Saare symbols ke candidates ko time order mein chala kar portfolio-level trades chunein.
+
+    `candidates` = [(symbol, symbol_candidates dict)]. Har symbol ki stream pehle se sorted hai,
+    unka heapq k-way merge hota hai; open positions ek exit-time heap mein rehti hain. Naye entry se
+    pehle us time tak ke exits band hote hain (capital aur slot wapas). Entry tab hi hoti hai jab
+    symbol ki koi position open na ho, `max_positions` se kam positions hon aur `capital_per_trade`
+    (ya bacha cash, jo kam ho) se kam se kam ek share aaye.
+
+    Returns (symbols, POSITION_DTYPE records entry order mein, skipped counts dict).
+    """
+    symbols = [symbol for symbol, _ in candidates]
+    arrays = [c for _, c in candidates]
+    streams = [zip(c["entry_time"].tolist(), [s] * len(c["entry_time"]), range(len(c["entry_time"])))
+               for s, c in enumerate(arrays)]
+
+    book = PositionBook()
+    open_heap = []  # (exit_time, slot)
+    open_symbols = set()
+    cash = float(initial_capital)
+    skipped = {"symbol_open": 0, "max_positions": 0, "capital": 0}
+
+    for time_ns, s, k in heapq.merge(*streams):
+        while open_heap and open_heap[0][0] <= time_ns:
+            _, slot = heapq.heappop(open_heap)
+            position = book.records[slot]
+            cash += position["entry"] * position["quantity"] + position["pnl"]
+            open_symbols.discard(int(position["symbol"]))
+        if s in open_symbols:
+            skipped["symbol_open"] += 1
+            continue
+        if len(open_heap) >= max_positions:
+            skipped["max_positions"] += 1
+            continue
+        c = arrays[s]
+        entry = c["entry"][k]
+        quantity = int(min(capital_per_trade, cash) // entry)
+        if quantity < 1:
+            skipped["capital"] += 1
+            continue
+        direction = int(c["direction"][k])
+        exit_price = c["exit"][k]
+        pnl = direction * (exit_price - entry) * quantity
+        exit_time = int(c["exit_time"][k])
+        slot = book.add(s, direction, c["reason"][k], quantity, time_ns, exit_time,
+                        entry, c["sl"][k], c["target"][k], exit_price, pnl)
+        heapq.heappush(open_heap, (exit_time, slot))
+        open_symbols.add(s)
+        cash -= entry * quantity
+
+    return symbols, book.records.copy(), skipped
+
+def positions_to_frame(symbols, records, tz=None):
+    """Position records se ek DataFrame (PORTFOLIO_COLUMNS)."""
+    entry_time = pd.DatetimeIndex(records["entry_time"])
+    exit_time = pd.DatetimeIndex(records["exit_time"])
+    if tz is not None:
+        entry_time = entry_time.tz_localize("UTC").tz_convert(tz)
+        exit_time = exit_time.tz_localize("UTC").tz_convert(tz)
+    return pd.DataFrame({
+        "Stock": np.asarray(symbols, dtype=object)[records["symbol"]] if len(records) else [],
+        "Direction": np.where(records["direction"] == 1, "Long", "Short").astype(object),
+        "Quantity": records["quantity"],
+        "Entry Time": entry_time,
+        "Entry": records["entry"],
+        "SL": records["sl"],
+        "Target": records["target"],
+        "Exit Time": exit_time,
+        "Exit": records["exit"],
+        "Result": EXIT_REASONS[records["reason"]],
+        "PnL": records["pnl"],
+    }, columns=PORTFOLIO_COLUMNS)
+
+def portfolio_summary(records, initial_capital):
+    """Trades, win rate, PnL aur realised equity (exit order mein) ka max drawdown."""
+    closed = records[records["reason"] != EXIT_END]
+    pnl = closed["pnl"][np.argsort(closed["exit_time"], kind="stable")]
+    equity = initial_capital + np.cumsum(pnl)
+    peak = np.maximum.accumulate(np.concatenate([[initial_capital], equity]))[1:]
+    return {
+        "Total Trades": len(closed),
+        "Winning Trades": int((pnl > 0).sum()),
+        "Winning Rate (%)": f"{(pnl > 0).mean() * 100 if len(pnl) else 0:.2f}%",
+        "Total PnL": float(pnl.sum()),
+        "Max Drawdown": float((peak - equity).max()) if len(pnl) else 0.0,
+        "Still Open": int(len(records) - len(closed)),
+    }
+
+# ================= Live journal =================
+def fill_journal_results(journal, store, interval="15m", signal_interval=None):
+    """Journal ke open trades ka Result (SL/Target) stored bars se bharein.
+
+    Entry bar ke baad ke bars par wahi intrabar rules lagte hain jo simulator mein hain. Jin trades
+    ka abhi tak SL/target nahi aaya, ya jinka entry bar store mein nahi hai, woh open rehte hain.
+    `interval` ek string ho sakta hai, ya symbol -> interval function (jaise `ResamplingProvider.base_for`)
+    jab har symbol ke bars alag interval par store hote hain. Signals stored (base) interval se bade bars
+    par bane hon to `signal_interval` dein: Entry Time signal bar ka label hai aur entry uske close par
+    hoti hai, isliye scan signal bar ke baad ke pehle base bar se shuru hota hai. Kitne trades update
+    hue, woh return hota hai.
+    """
+    if signal_interval is None or signal_interval == "1d":
+        signal_length = pd.Timedelta(days=1) if signal_interval else None
+    else:
+        signal_length = pd.Timedelta(minutes=INTERVAL_MINUTES[signal_interval])
+    interval_for = interval if callable(interval) else (lambda symbol: interval)
+    trades = journal.open_trades()
+    by_stock = {}
+    for trade in trades:
+        by_stock.setdefault(trade[1], []).append(trade)
+
+    updated = 0
+    for stock, rows in by_stock.items():
+        # Ek stock ki kharab row/bars se baaki stocks (aur live loop) nahi rukte
+        try:
+            updated += _fill_stock_results(journal, store.load(stock, interval_for(stock)), rows, signal_length)
+        except Exception as e:
+            print(f"{stock} Result update error: {e}")
+    return updated
+
+def _fill_stock_results(journal, bars, rows, signal_length):
+    if bars is None or bars.empty:
+        return 0
+    # Entry Time har row ka alag parse: purane CSV imports mein naive aur tz-aware dono mil sakte hain
+    times = [_bar_time(row[7], bars.index.tz) for row in rows]
+    rows = [row for row, t in zip(rows, times) if t is not None]
+    if not rows:
+        return 0
+    entry_times = pd.DatetimeIndex([t for t in times if t is not None])
+    entry_idx = bars.index.searchsorted(entry_times, side="right") - 1
+    # Entry wala bar store mein hona chahiye; store usse baad shuru ho (jaise import kiye purane trades)
+    # to baad ke bars se result nahi banta, trade open rehta hai
+    has_entry_bar = (entry_idx >= 0) & (bars.index[np.maximum(entry_idx, 0)] == entry_times)
+    if not has_entry_bar.any():
+        return 0
+    rows = [row for row, ok in zip(rows, has_entry_bar) if ok]
+    entry_idx = entry_idx[has_entry_bar]
+    if signal_length is not None:
+        # Signal bar ke andar ke base bars entry se pehle ke hain; aakhri andar wale bar ke baad se scan
+        entry_idx = bars.index.searchsorted(entry_times[has_entry_bar] + signal_length, side="left") - 1
+    direction = np.array([1 if r[2] == "Long" else -1 for r in rows], dtype=np.int8)
+    _, _, reason = find_exits(
+        bars["Open"].to_numpy(dtype=float), bars["High"].to_numpy(dtype=float),
+        bars["Low"].to_numpy(dtype=float), bars["Close"].to_numpy(dtype=float), entry_idx, direction,
+        np.array([r[4] for r in rows], dtype=float), np.array([r[5] for r in rows], dtype=float))
+    updated = 0
+    for row, code in zip(rows, reason):
+        if code != EXIT_END:
+            journal.set_result(row[0], EXIT_REASONS[code])
+            updated += 1
+    return updated
+
+def _bar_time(value, tz):
+    """Journal ka Entry Time bars ke timezone mein; parse na ho to None (trade open rehta hai)."""
+    try:
+        ts = pd.Timestamp(value)
+    except (TypeError, ValueError):
+        return None
+    if ts is pd.NaT:
+        return None
+    if tz is None:
+        return ts.tz_localize(None) if ts.tzinfo is not None else ts
+    return ts.tz_localize(tz) if ts.tzinfo is None else ts.tz_convert(tz)
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import RSI_VWAP_VOL_msg_2 as strategy
+
+def random_bars(seed, n=1500):
+    rng = np.random.default_rng(seed)
+    # Ek level ke aas-paas ghoomta price, taaki VWAP baar-baar cross ho aur RSI dono extremes chhue
+    close = 100 + 3 * np.sin(np.arange(n) / 15) + np.cumsum(rng.normal(0, 0.3, n)) * 0.2
+    index = pd.date_range("2025-01-01 09:15", periods=n, freq="15min", tz="Asia/Kolkata")
+    return pd.DataFrame({"Open": close, "High": close + rng.uniform(0, 0.5, n), "Low": close - rng.uniform(0, 0.5, n),
+                         "Close": close, "Volume": rng.uniform(500, 5000, n)}, index=index)
+
+def random_arrays(seed, n=2000):
+    # Seedhe indicator arrays, jahan signals ghane hain (exit ke turant baad dobara entry bhi)
+    rng = np.random.default_rng(seed)
+    return (100 + rng.normal(0, 1, n), np.full(n, 100.0), rng.uniform(0, 100, n),
+            rng.uniform(500, 5000, n), rng.uniform(500, 5000, n))
+
+def loop_trades(close, vwap_values, rsi_values, volume, volume_avg, rsi_low=30, rsi_high=70,
+                volume_multiplier=None):
+    # Purana bar-by-bar loop: signal par entry, Close VWAP ke doosri taraf jaye to exit, open trade record nahi
+    volume_multiplier = strategy.VOLUME_MULTIPLIER if volume_multiplier is None else volume_multiplier
+    trades, in_trade = [], False
+    for i in range(len(close)):
+        if not in_trade:
+            volume_ok = volume[i] > volume_multiplier * volume_avg[i]
+            if close[i] > vwap_values[i] and rsi_values[i] < rsi_low and volume_ok:
+                in_trade, direction, entry = True, 1, i
+            elif close[i] < vwap_values[i] and rsi_values[i] > rsi_high and volume_ok:
+                in_trade, direction, entry = True, -1, i
+        elif (direction == 1 and close[i] < vwap_values[i]) or (direction == -1 and close[i] > vwap_values[i]):
+            trades.append((direction, entry, i))
+            in_trade = False
+    return trades
+
+def as_trades(entry_idx, exit_idx, direction):
+    return list(zip(direction.tolist(), entry_idx.tolist(), exit_idx.tolist()))
+
+# ================= Vectorized engine vs loop =================
+@pytest.mark.parametrize("seed", range(5))
+def test_simulate_vwap_cross_matches_loop(seed):
+    arrays = random_arrays(seed)
+    expected = loop_trades(*arrays)
+    assert len(expected) > 100
+    assert as_trades(*strategy.simulate_vwap_cross(*arrays)) == expected
+
+def test_batch_combinations_match_loop():
+    arrays = random_arrays(7)
+    grid = [(30, 70, 1.0), (40, 60, 0.5), (10, 90, 1.5), (45, 55, 2.0)]
+    rsi_low, rsi_high, multiplier = (np.array(p) for p in zip(*grid))
+    results = strategy.simulate_vwap_cross_batch(*arrays, rsi_low, rsi_high, multiplier)
+    for params, result in zip(grid, results):
+        expected = loop_trades(*arrays, *params)
+        assert expected
+        assert as_trades(*result) == expected
+
+@pytest.mark.parametrize("seed", range(3))
+def test_backtest_ticker_matches_loop(seed):
+    data = random_bars(seed)
+    close = data["Close"].to_numpy()
+    expected = loop_trades(close, strategy.vwap(data).to_numpy(), strategy.rsi(data["Close"]).to_numpy(),
+                           data["Volume"].to_numpy(), strategy.volume_average(data).to_numpy())
+    assert expected
+    result = strategy.backtest_ticker(data)
+    assert result["Direction"].tolist() == [d for d, _, _ in expected]
+    assert result["Entry"].tolist() == [close[i] for _, i, _ in expected]
+    assert result["Exit"].tolist() == [close[j] for _, _, j in expected]
+    assert result["PnL"].tolist() == [d * (close[j] - close[i]) for d, i, j in expected]
+    assert pd.to_timedelta(result["Duration"]).tolist() == [data.index[j] - data.index[i] for _, i, j in expected]
+
+def test_open_trade_at_end_is_not_recorded():
+    close = np.array([101.0, 102.0, 103.0])
+    # Pehle bar par Long entry, par Close kabhi VWAP ke neeche nahi aata
+    entry_idx, exit_idx, _ = strategy.simulate_vwap_cross(close, np.full(3, 100.0), np.full(3, 10.0),
+                                                          np.full(3, 10.0), np.ones(3))
+    assert len(entry_idx) == 0 and len(exit_idx) == 0
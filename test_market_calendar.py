@@ -0,0 +1,39 @@
+import datetime as dt
+
+import pandas as pd
+
+from market_calendar import BarCloseScheduler, MarketCalendar
+
+def ist(text):
+    return pd.Timestamp(text, tz="Asia/Kolkata")
+
+def make_scheduler(now, last_run, **kwargs):
+    clock = [now.timestamp()]
+
+    def sleep(seconds):
+        clock[0] += seconds
+
+    calendar = MarketCalendar(holidays={dt.date(2025, 10, 2)})
+    return BarCloseScheduler(calendar, 15, offset_seconds=20, last_run=last_run, clock=lambda: clock[0],
+                             sleep=sleep, **kwargs)
+
+# ================= Scheduler catch-up =================
+def test_missed_bar_closes_run_in_order_after_restart():
+    scheduler = make_scheduler(ist("2025-09-30 11:05"), last_run=ist("2025-09-30 10:00"))
+    seen = []
+    scheduler.run_once(seen.append)
+    assert seen == [ist("2025-09-30 10:15"), ist("2025-09-30 10:30"), ist("2025-09-30 10:45"),
+                    ist("2025-09-30 11:00")]
+    assert scheduler.last_run == ist("2025-09-30 11:00") and scheduler.skipped == 0
+
+def test_catch_up_skips_holidays_and_is_bounded():
+    # 1 Oct 14:00 ke baad band, 3 Oct (2 Oct holiday) 10:01 par restart: 9 closes chhoote, sirf aakhri 4 chalte hain
+    scheduler = make_scheduler(ist("2025-10-03 10:01"), last_run=ist("2025-10-01 14:00"), max_catch_up=4)
+    seen = []
+    scheduler.run_once(seen.append)
+    assert seen == [ist("2025-10-01 15:30"), ist("2025-10-03 09:30"), ist("2025-10-03 09:45"),
+                    ist("2025-10-03 10:00")]
+    assert scheduler.skipped == 5
+
+def test_default_catch_up_covers_one_session():
+    assert make_scheduler(ist("2025-09-30 11:05"), last_run=None).max_catch_up == 25
@@ -0,0 +1,126 @@
+import time
+
+import pandas as pd
+
+from market_data import (BarStore, CachedProvider, FakeProvider, ResamplingProvider, fetch_concurrent, resample_bars,
+                         slice_period)
+
+SYMBOLS = [f"SYM{i}.NS" for i in range(8)]
+NOW = pd.Timestamp("2025-09-03 12:00", tz="Asia/Kolkata")
+
+def fake_provider(latency=0.0):
+    # Chhoti history taaki test mein sirf injected latency measure ho, bars banane ka CPU time nahi
+    return FakeProvider(start="2025-08-01", clock=lambda: NOW, latency=latency)
+
+# ================= fetch_concurrent =================
+def test_fetch_concurrent_overlaps_latency():
+    provider = fake_provider(latency=0.2)
+    start = time.monotonic()
+    for symbol in SYMBOLS:
+        provider.history(symbol, "15m", "2d")
+    serial = time.monotonic() - start
+
+    start = time.monotonic()
+    results = list(fetch_concurrent(provider, SYMBOLS, "15m", "2d", max_workers=len(SYMBOLS), retries=0))
+    concurrent = time.monotonic() - start
+
+    assert sorted(symbol for symbol, _, _ in results) == sorted(SYMBOLS)
+    assert all(error is None and not data.empty for _, data, error in results)
+    assert concurrent < serial / 2
+
+def test_fetch_concurrent_slow_symbol_times_out():
+    provider = fake_provider(latency=lambda symbol: 5.0 if symbol == "SLOW.NS" else 0.05)
+    start = time.monotonic()
+    results = list(fetch_concurrent(provider, ["SLOW.NS"] + SYMBOLS, "15m", "2d", max_workers=4,
+                                    timeout=0.5, retries=0))
+    elapsed = time.monotonic() - start
+
+    errors = {symbol: error for symbol, _, error in results}
+    assert isinstance(errors.pop("SLOW.NS"), TimeoutError)
+    assert sorted(errors) == sorted(SYMBOLS) and not any(errors.values())
+    # Baaki symbols slow wale ka intezaar kiye bina aate hain
+    assert [symbol for symbol, _, _ in results][-1] == "SLOW.NS"
+    assert elapsed < 2.0
+
+# ================= CachedProvider =================
+def test_cached_provider_fetches_only_new_bars(tmp_path):
+    now = [NOW]
+    provider = FakeProvider(start="2025-08-01", clock=lambda: now[0])
+    cached = CachedProvider(provider, BarStore(str(tmp_path)))
+
+    first = cached.history("X.NS", "15m", "2d")
+    assert provider.calls == 1
+    served = provider.bars_served
+
+    # 30 minute baad: sirf aakhri do stored bars aur do naye bars network se aate hain
+    now[0] += pd.Timedelta(minutes=30)
+    second = cached.history("X.NS", "15m", "2d")
+    assert provider.calls == 2
+    assert provider.bars_served - served == 4
+    assert len(second) > len(first)
+    pd.testing.assert_frame_equal(second, FakeProvider(start="2025-08-01", clock=lambda: now[0])
+                                  .history("X.NS", "15m", "2d"), check_freq=False)
+
+    # Bada period store mein nahi hai, isliye poora fetch hota hai
+    cached.history("X.NS", "15m", "5d")
+    assert provider.calls == 3
+    assert cached.store.load_meta("X.NS", "15m")["period"] == "5d"
+
+
+class AdjustingProvider(FakeProvider):
+    """FakeProvider jiske saare prices `factor` se scale hote hain (split/dividend adjust), aur jo
+    `window_days` se purana `start` hone par kuch nahi deta (yfinance ki intraday limit ki tarah)."""
+
+    def __init__(self, *args, window_days=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.factor = 1.0
+        self.window_days = window_days
+
+    def history(self, symbol, interval, period=None, start=None):
+        if start is not None and self.window_days is not None \
+                and self.clock() - pd.Timestamp(start) > pd.Timedelta(days=self.window_days):
+            return super().history(symbol, interval, start=self.clock() + pd.Timedelta(days=1))
+        bars = super().history(symbol, interval, period=period, start=start)
+        bars[["Open", "High", "Low", "Close"]] *= self.factor
+        return bars
+
+def test_cached_provider_refetches_after_price_adjustment(tmp_path):
+    now = [NOW]
+    provider = AdjustingProvider(start="2025-08-01", clock=lambda: now[0])
+    cached = CachedProvider(provider, BarStore(str(tmp_path)))
+    cached.history("X.NS", "15m", "5d")
+
+    # 1:2 split: Yahoo purane bars bhi aadhe kar deta hai
+    provider.factor = 0.5
+    now[0] += pd.Timedelta(minutes=30)
+    bars = cached.history("X.NS", "15m", "5d")
+    assert provider.calls == 3
+    pd.testing.assert_frame_equal(bars, provider.history("X.NS", "15m", "5d"), check_freq=False)
+
+def test_cached_provider_refetches_after_long_outage(tmp_path):
+    now = [NOW]
+    provider = AdjustingProvider(start="2025-06-01", clock=lambda: now[0], window_days=60)
+    cached = CachedProvider(provider, BarStore(str(tmp_path)))
+    cached.history("X.NS", "15m", "5d")
+
+    # Outage intraday window se lamba: start wala request khaali aata hai, poora period dobara
+    now[0] += pd.Timedelta(days=90)
+    bars = cached.history("X.NS", "15m", "5d")
+    assert bars.index[-1] > NOW + pd.Timedelta(days=89)
+    pd.testing.assert_frame_equal(bars, provider.history("X.NS", "15m", "5d"), check_freq=False)
+
+# ================= ResamplingProvider =================
+def test_resampled_history_has_no_gap_after_downtime(tmp_path):
+    now = [NOW]
+    provider = FakeProvider(start="2025-06-01", clock=lambda: now[0])
+    store = BarStore(str(tmp_path))
+    resampling = ResamplingProvider(CachedProvider(provider, store), "15m", store=store, refresh_seconds=0)
+
+    resampling.history("X.NS", "1h", "1mo")
+    # Do hafte band rehne ke baad live loop ka chhota "2d" request, phir lamba request
+    now[0] += pd.Timedelta(days=14)
+    resampling.history("X.NS", "1h", "2d")
+    bars = resampling.history("X.NS", "1h", "1mo")
+
+    expected = slice_period(resample_bars(provider.history("X.NS", "15m", "1mo"), "1h"), "1mo")
+    pd.testing.assert_frame_equal(bars, expected, check_freq=False)
@@ -0,0 +1,49 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from notifier import TelegramDispatcher
+
+# ================= TelegramDispatcher =================
+@pytest.fixture
+def telegram_stub():
+    """Local Bot API stub: pehli request par 429 (retry_after=1), uske baad 200."""
+    requests_seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            requests_seen.append(time.monotonic())
+            if len(requests_seen) == 1:
+                status, body = 429, {"ok": False, "error_code": 429, "parameters": {"retry_after": 1}}
+            else:
+                status, body = 200, {"ok": True}
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", requests_seen
+    server.shutdown()
+    server.server_close()
+
+def test_telegram_dispatcher_honours_retry_after(telegram_stub):
+    api_url, requests_seen = telegram_stub
+    # Backoff bahut lamba hai: message time par pahunche to retry_after hi maana gaya
+    dispatcher = TelegramDispatcher("TOKEN", "1", api_url=api_url, backoff=30, min_interval=0)
+    dispatcher.send("LONG Signal: X.NS")
+
+    assert dispatcher.flush(timeout=5)
+    assert dispatcher.sent == 1 and dispatcher.failed == 0
+    assert len(requests_seen) == 2
+    assert requests_seen[1] - requests_seen[0] >= 0.9
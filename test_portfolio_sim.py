@@ -0,0 +1,52 @@
+import pandas as pd
+
+from market_data import BarStore
+from portfolio_sim import fill_journal_results
+from trade_journal import TradeJournal
+
+DAY = pd.Timestamp("2025-09-22 09:15", tz="Asia/Kolkata")
+
+def store_bars(store, symbol, lows, highs, interval="15m"):
+    index = pd.date_range(DAY, periods=len(lows), freq="15min", name="Datetime")
+    store.save(symbol, interval, pd.DataFrame(
+        {"Open": 100.0, "High": highs, "Low": lows, "Close": 100.0, "Volume": 1_000.0}, index=index))
+    return index
+
+# ================= fill_journal_results =================
+def test_hourly_signal_scans_base_bars_after_the_signal_bar(tmp_path):
+    store = BarStore(str(tmp_path / "bars"))
+    journal = TradeJournal(str(tmp_path / "journal.db"))
+    # 09:45 wala 15m bar SL se neeche gaya, par woh 1h signal bar (09:15-10:15) ke andar hai
+    store_bars(store, "X.NS", lows=[99, 99, 94, 99, 99, 99], highs=[101] * 6)
+    journal.append("X.NS", "Long", 100, 95, 110, DAY)
+
+    assert fill_journal_results(journal, store, "15m", signal_interval="1h") == 0
+    assert journal.open_trades()
+
+    store_bars(store, "X.NS", lows=[99, 99, 94, 99, 99, 99, 99], highs=[101] * 6 + [111])
+    assert fill_journal_results(journal, store, "15m", signal_interval="1h") == 1
+    assert not journal.open_trades()
+
+def test_trades_without_an_entry_bar_stay_open(tmp_path):
+    store = BarStore(str(tmp_path / "bars"))
+    journal = TradeJournal(str(tmp_path / "journal.db"))
+    store_bars(store, "X.NS", lows=[99, 94, 99], highs=[101] * 3)
+    # Store shuru hone se pehle ka (import kiya hua) trade, aur bar ke beech ka entry time
+    journal.append("X.NS", "Long", 100, 95, 110, pd.Timestamp("2025-08-01 10:00", tz="Asia/Kolkata"))
+    journal.append("X.NS", "Long", 100, 95, 110, DAY + pd.Timedelta(minutes=5))
+
+    assert fill_journal_results(journal, store, "15m") == 0
+    assert len(journal.open_trades()) == 2
+
+def test_mixed_entry_time_formats_and_bad_rows_do_not_stop_the_fill(tmp_path):
+    store = BarStore(str(tmp_path / "bars"))
+    journal = TradeJournal(str(tmp_path / "journal.db"))
+    store_bars(store, "X.NS", lows=[99, 94, 99], highs=[101] * 3)
+    store_bars(store, "Y.NS", lows=[99, 94, 99], highs=[101] * 3)
+    journal.append("X.NS", "Long", 100, 95, 110, DAY)
+    journal.append("X.NS", "Long", 100, 95, 110, "2025-09-22 09:15:00")  # Purane CSV import jaisa naive time
+    journal.append("X.NS", "Long", 100, 95, 110, "not a time")
+    journal.append("Y.NS", "Long", 100, 95, 110, DAY)
+
+    assert fill_journal_results(journal, store, "15m") == 3
+    assert [row[7] for row in journal.open_trades()] == ["not a time"]
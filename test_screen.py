@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import RSI_VWAP_VOL_msg_2 as strategy
+from indicators import panel_ema, stack_frames, unstack_row
+from market_data import FakeProvider
+
+NOW = pd.Timestamp("2025-09-03 12:00", tz="Asia/Kolkata")
+
+def universe(count=40):
+    provider = FakeProvider(start="2025-08-20", clock=lambda: NOW)
+    frames = {}
+    for i in range(count):
+        df = provider.history(f"SYM{i}.NS", "15m", "2d")
+        # Alag-alag lengths aur kuch NaN bars, taaki padding aur dropna dono chalein
+        df = df.iloc[i % 7:].copy()
+        if i % 5 == 0:
+            df.iloc[len(df) // 2, df.columns.get_loc("Close")] = np.nan
+        frames[f"SYM{i}.NS"] = df
+    # Tez chadhaav ke baad girawat (VWAP ke upar, RSI < 30) aur ulta, taaki Long/Short dono signals bane
+    rng = np.random.default_rng(1)
+    index = frames["SYM0.NS"].index
+    for i in range(count // 2):
+        sign = 1 if i % 2 else -1
+        close = 100 + sign * np.concatenate([np.linspace(0, 30, len(index) - 14), 30 - np.linspace(0.5, 5, 14)])
+        volume = rng.uniform(1000, 3000, len(index))
+        frames[f"TREND{i}.NS"] = pd.DataFrame({"Open": close, "High": close + 0.2, "Low": close - 0.2,
+                                               "Close": close, "Volume": volume}, index=index)
+    return frames
+
+def screen_one(ticker, df):
+    # check_signal wala per-ticker raasta: dropna, phir vwap/rsi/volume_average ka aakhri bar
+    df = df.dropna()
+    close, volume = df['Close'].iloc[-1], df['Volume'].iloc[-1]
+    last_vwap = strategy.vwap(df).iloc[-1]
+    last_rsi = strategy.rsi(df['Close']).iloc[-1]
+    volume_ok = volume > strategy.VOLUME_MULTIPLIER * strategy.volume_average(df).iloc[-1]
+    if close > last_vwap and last_rsi < 30 and volume_ok:
+        sl = last_vwap * (1 - strategy.STOP_BUFFER)
+        return ticker, "Long", close, sl, close + (close - sl) * strategy.RISK_REWARD
+    if close < last_vwap and last_rsi > 70 and volume_ok:
+        sl = last_vwap * (1 + strategy.STOP_BUFFER)
+        return ticker, "Short", close, sl, close - (sl - close) * strategy.RISK_REWARD
+    return None
+
+# ================= screen_universe =================
+@pytest.mark.parametrize("multiplier", [0.3, 1.0])
+def test_screen_universe_matches_per_ticker(monkeypatch, multiplier):
+    monkeypatch.setattr(strategy, "VOLUME_MULTIPLIER", multiplier)
+    frames = universe()
+    expected = [hit for hit in (screen_one(t, df) for t, df in frames.items()) if hit]
+
+    signals = strategy.screen_universe(frames)
+
+    assert list(signals["Stock"]) == [hit[0] for hit in expected]
+    assert list(signals["Direction"]) == [hit[1] for hit in expected]
+    np.testing.assert_allclose(signals[["Entry", "SL", "Target"]].to_numpy(dtype=float),
+                               np.array([hit[2:] for hit in expected], dtype=float).reshape(-1, 3))
+    for _, row in signals.iterrows():
+        assert row["Entry Time"] == frames[row["Stock"]].dropna().index[-1]
+
+def test_screen_universe_empty():
+    assert strategy.screen_universe({"A.NS": pd.DataFrame()}).empty
+
+# ================= Panel helpers =================
+def test_stack_frames_rows_match_each_frame():
+    frames = universe(10)
+    symbols, lengths, panel = stack_frames(frames, dropna=True)
+    for row, symbol in enumerate(symbols):
+        df = frames[symbol].dropna()
+        assert lengths[row] == len(df)
+        np.testing.assert_array_equal(unstack_row(panel["Close"][row], lengths[row]), df["Close"].to_numpy())
+
+def test_panel_ema_matches_pandas_with_padding():
+    rng = np.random.default_rng(0)
+    x = rng.normal(100, 1, (3, 50))
+    x[1, :10] = np.nan  # chhoti history ki padding
+    x[2, 25] = np.nan   # beech ka missing bar
+    result = panel_ema(x, span=9)
+    for row in range(3):
+        expected = pd.Series(x[row]).ewm(span=9, adjust=False, ignore_na=True).mean().to_numpy().copy()
+        expected[np.isnan(x[row])] = np.nan
+        np.testing.assert_allclose(result[row], expected, equal_nan=True)
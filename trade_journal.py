@@ -0,0 +1,125 @@
+import csv
+import os
+import sqlite3
+from contextlib import contextmanager
+
+import pandas as pd
+
+# real_time_trade_log.csv ka column layout (downstream sheets isi par chalti hain)
+TRADE_LOG_COLUMNS = ["Stock", "Direction", "Entry", "SL", "Target", "Result", "Entry Time"]
+
+class TradeJournal:
+    """Live signals ka append-only journal (SQLite, WAL mode).
+
+    Har append O(1) hai; poori file dobara nahi likhi jaati. `batch()` ke andar ke appends
+    ek saath commit hote hain (ek cycle = ek commit). `csv_mirror` diya ho to har commit ke
+    naye rows us CSV ke end mein jod diye jaate hain, taaki purana CSV layout chalta rahe.
+    """
+
+    def __init__(self, path, csv_mirror=None):
+        self.csv_mirror = csv_mirror
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS trades ("
+            "id INTEGER PRIMARY KEY, stock TEXT NOT NULL, direction TEXT NOT NULL, entry REAL, "
+            "sl REAL, target REAL, result TEXT, entry_time TEXT NOT NULL)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_trades_stock_time ON trades (stock, entry_time)")
+        self.conn.commit()
+        self._batch_depth = 0
+        self._uncommitted = []
+
+    # ---------- Writes ----------
+    def append(self, stock, direction, entry, sl, target, entry_time, result=None):
+        """Ek trade jodein; batch ke bahar ho to turant commit hota hai."""
+        row = (stock, direction, entry, sl, target, result, str(entry_time))
+        self.conn.execute(
+            "INSERT INTO trades (stock, direction, entry, sl, target, result, entry_time) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)", row)
+        self._uncommitted.append(row)
+        if not self._batch_depth:
+            self.commit()
+
+    @contextmanager
+    def batch(self):
+        """Andar ke saare appends ek commit mein (jaise ek monitoring cycle)."""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self.commit()
+
+    def commit(self):
+        if not self._uncommitted:
+            return
+        self.conn.commit()
+        if self.csv_mirror:
+            self._append_csv(self.csv_mirror, self._uncommitted)
+        self._uncommitted = []
+
+    def set_result(self, trade_id, result):
+        self.conn.execute("UPDATE trades SET result = ? WHERE id = ?", (result, trade_id))
+        if not self._batch_depth:
+            self.conn.commit()
+
+    # ---------- Reads ----------
+    def open_trades(self, stock=None):
+        """Jin trades ka Result abhi khaali hai (stock diya ho to sirf uske), entry time ke order mein."""
+        query = "SELECT id, stock, direction, entry, sl, target, result, entry_time FROM trades WHERE result IS NULL"
+        params = ()
+        if stock is not None:
+            query += " AND stock = ?"
+            params = (stock,)
+        return self.conn.execute(query + " ORDER BY entry_time", params).fetchall()
+
+    def find(self, stock, entry_time):
+        """Stock aur entry time se trade dhoondhein (index se); na mile to None."""
+        return self.conn.execute(
+            "SELECT id, stock, direction, entry, sl, target, result, entry_time FROM trades "
+            "WHERE stock = ? AND entry_time = ?", (stock, str(entry_time))).fetchone()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM trades").fetchone()[0]
+
+    # ---------- CSV compatibility ----------
+    def to_frame(self):
+        rows = self.conn.execute(
+            "SELECT stock, direction, entry, sl, target, result, entry_time FROM trades ORDER BY id").fetchall()
+        return pd.DataFrame(rows, columns=TRADE_LOG_COLUMNS)
+
+    def export_csv(self, path):
+        """Poora journal purane real_time_trade_log.csv layout mein likhein."""
+        self.to_frame().to_csv(path, index=False)
+
+    def import_csv(self, path):
+        """Purane CSV log ke rows journal mein laayein (sirf khaali journal mein, ek baar migration ke liye)."""
+        if len(self) or not os.path.exists(path):
+            return 0
+        old = pd.read_csv(path)
+        rows = [(r["Stock"], r["Direction"], r["Entry"], r["SL"], r["Target"],
+                 None if pd.isna(r["Result"]) else r["Result"], str(r["Entry Time"]))
+                for _, r in old.iterrows()]
+        self.conn.executemany(
+            "INSERT INTO trades (stock, direction, entry, sl, target, result, entry_time) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        self.conn.commit()
+        return len(rows)
+
+    @staticmethod
+    def _append_csv(path, rows):
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        with open(path, "a", newline="") as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(TRADE_LOG_COLUMNS)
+            for stock, direction, entry, sl, target, result, entry_time in rows:
+                writer.writerow([stock, direction, entry, sl, target, "" if result is None else result, entry_time])
+            f.flush()
+            os.fsync(f.fileno())
+
+    def close(self):
+        self.commit()
+        self.conn.close()